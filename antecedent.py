@@ -0,0 +1,111 @@
+import os
+import sys
+import warnings
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from dataset_cache import open_date
+from file_index import index_files_by_date
+from interpolation import stencil_index
+from merra2_grid import crop_to_window, in_window
+from weather import group_fires_by_date
+
+# Daily variables kept in the sliding window
+WINDOW_VARIABLES = ['T2M', 'QV2M', 'TQL', 'TQI', 'U2M', 'V2M']
+
+# Days with less total precipitable liquid and ice water than this (kg m-2) count as dry
+DRY_THRESHOLD = 0.05
+
+# Names of the antecedent columns for a lookback length
+def antecedent_columns(lookback):
+    return [f'{name}_{lookback}D' for name in ['TEMP_MEAN', 'TEMP_MAX', 'HUMIDITY_MEAN', 'WIND_MEAN', 'WIND_MAX', 'PRECIP_WATER_SUM', 'DRY_DAYS']]
+
+# Read the first time step of one day as a (lat, lon, variable) grid cropped to the validity window
+def read_window_grid(data):
+    data = crop_to_window(data)
+    grids = [data[name][0].values for name in WINDOW_VARIABLES]
+    return np.stack(grids, axis=-1).astype(np.float64), data['lat'].values, data['lon'].values
+
+# Rolling weather aggregates over the lookback days ending on each ignition date
+# Wildfires are visited in date order so every daily data file is read once per run, not once per wildfire per day
+def antecedent_weather(fire_data, date_index, lookback=7, dry_threshold=DRY_THRESHOLD):
+    latitudes = pd.to_numeric(fire_data['LATITUDE'], errors='coerce').to_numpy(dtype=float)
+    longitudes = pd.to_numeric(fire_data['LONGITUDE'], errors='coerce').to_numpy(dtype=float)
+    valid = in_window(latitudes, longitudes)
+
+    # Wildfires without any weather in their window keep NaN
+    columns = np.full((len(fire_data), 7), np.nan)
+
+    # Sliding window of loaded daily grids flattened to (cells, variables), None marks a day without data
+    window = {}
+    lat = lon = None
+
+    for date, positions in sorted(group_fires_by_date(fire_data).items()):
+        # Skip impossible dates such as a day of 0
+        try:
+            end = datetime.strptime(date, '%Y%m%d')
+        except ValueError:
+            continue
+        positions = positions[valid[positions]]
+        if not len(positions):
+            continue
+
+        # Drop the days that left the window and load the ones that entered it
+        days = [(end - timedelta(days=offset)).strftime('%Y%m%d') for offset in range(lookback - 1, -1, -1)]
+        for day in [day for day in window if day < days[0]]:
+            del window[day]
+        for day in days:
+            if day not in window:
+                data = open_date(date_index, day)
+                window[day] = None
+                if data is not None:
+                    grid, lat, lon = read_window_grid(data)
+                    window[day] = grid.reshape(-1, len(WINDOW_VARIABLES))
+
+        grids = [window[day] for day in days]
+        if all(grid is None for grid in grids):
+            continue
+
+        # Gather only the four corners of every wildfire from each day, then weight them, giving (days, wildfires, variables)
+        # Copying the full grids of the window once per ignition date would cost more than the reads it saves
+        corners, weights = stencil_index(lat, lon).lookup(latitudes[positions], longitudes[positions])
+        missing = np.full(corners.shape + (len(WINDOW_VARIABLES),), np.nan)
+        stack = np.stack([grid[corners] if grid is not None else missing for grid in grids])
+        values = (stack * weights[None, :, :, None]).sum(axis=2)
+        temp, humidity, liquid, ice, east_wind, north_wind = np.moveaxis(values, -1, 0)
+
+        # Wind magnitude and precipitable water are derived after interpolation, like pastWeather
+        wind = np.sqrt(east_wind**2 + north_wind**2)
+        water = liquid + ice
+
+        # Consecutive dry days ending on the ignition date, a day without data ends the run
+        wet = np.vstack([~(water < dry_threshold)[::-1], np.ones((1, len(positions)), dtype=bool)])
+        dry_days = np.argmax(wet, axis=0)
+
+        # Days without data are ignored by the aggregates, all-missing windows give NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            water_sum = np.where(np.isnan(water).all(axis=0), np.nan, np.nansum(water, axis=0))
+            columns[positions] = np.column_stack([
+                np.nanmean(temp, axis=0), np.nanmax(temp, axis=0),
+                np.nanmean(humidity, axis=0),
+                np.nanmean(wind, axis=0), np.nanmax(wind, axis=0),
+                water_sum, dry_days,
+            ])
+
+    for i, name in enumerate(antecedent_columns(lookback)):
+        fire_data[name] = columns[:, i]
+    return fire_data
+
+if __name__ == "__main__":
+    from compact_store import CompactStore
+
+    # Usage: python antecedent.py <fire_data.csv> <weather data folder or compact store> <output.csv> [lookback days]
+    fire_path, data_path, output_path = sys.argv[1:4]
+    lookback = int(sys.argv[4]) if len(sys.argv) > 4 else 7
+    date_index = CompactStore(data_path) if os.path.isfile(data_path) else index_files_by_date(data_path)
+
+    fire_data = pd.read_csv(fire_path, sep=',', header=0, dtype={'YEAR': 'str', 'MONTH': 'str', 'DAY': 'str'}, float_precision='round_trip')
+    fire_data = antecedent_weather(fire_data, date_index, lookback)
+    fire_data.to_csv(output_path, index=False, header=True)
+    print("Antecedent weather association completed successfully!")
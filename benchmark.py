@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import xarray as xr
+from merra2_grid import LAND_VARIABLES, WEATHER_VARIABLES
+
+# Global MERRA2 grid
+GRID_LAT = np.arange(-90, 90.25, 0.5)
+GRID_LON = np.arange(-180, 180, 0.625)
+
+# Typical value range of each synthetic variable
+VARIABLE_RANGES = {
+    'QV2M': (0.001, 0.02),
+    'T2M': (250.0, 310.0),
+    'TQI': (0.0, 0.1),
+    'TQL': (0.0, 0.3),
+    'TQV': (5.0, 40.0),
+    'U2M': (-6.0, 6.0),
+    'V2M': (-6.0, 6.0),
+    'TSURF': (250.0, 310.0),
+    'GWETTOP': (0.0, 1.0),
+    'LHLAND': (0.0, 150.0),
+    'SHLAND': (-20.0, 120.0),
+    'PRECTOTLAND': (0.0, 1e-4),
+    'LAI': (0.0, 6.0),
+    'GRN': (0.0, 1.0),
+    'SWLAND': (0.0, 300.0),
+    'EVPTRNS': (0.0, 1e-4),
+    'RZMC': (0.0, 0.5),
+}
+
+# Every benchmark, the scale is the number of wildfires (or model rows) it processes
+BENCHMARKS = ['index_files_by_date', 'pastWeather', 'futureWeather', 'associate_weather', 'associate_weather_parallel', 'regression_fit', 'regression_fit_in_memory']
+
+# Smooth random field with small scale noise on the global grid, shaped (time, lat, lon)
+def synthetic_field(rng, name, steps):
+    low, high = VARIABLE_RANGES[name]
+    lat_wave = np.cos(np.radians(GRID_LAT))[:, None]
+    lon_wave = np.sin(np.radians(GRID_LON) * rng.integers(1, 4) + rng.uniform(0, np.pi))[None, :]
+    base = 0.6 * lat_wave + 0.2 * lon_wave
+    noise = rng.random((steps, len(GRID_LAT), len(GRID_LON)))
+    field = (base[None] + 0.2 * noise - base.min()) / (base.max() - base.min() + 0.2)
+    return (low + (high - low) * field).astype(np.float32)
+
+# Write one MERRA2-shaped file with the given variables and time steps
+def write_synthetic_file(path, variables, steps, timestamp, rng):
+    coords = {'time': pd.date_range(timestamp, periods=steps, freq='h'), 'lat': GRID_LAT, 'lon': GRID_LON}
+    data = xr.Dataset({name: (('time', 'lat', 'lon'), synthetic_field(rng, name, steps)) for name in variables}, coords=coords)
+    data.to_netcdf(path, encoding={name: {'zlib': True, 'complevel': 1} for name in variables})
+
+# Generate daily M2T1NXSLV and monthly M2TMNXLND files for a list of dates, existing files are kept
+def generate_merra2_files(output_dir, dates, hours=1, seed=0):
+    daily_dir = os.path.join(output_dir, 'daily')
+    land_dir = os.path.join(output_dir, 'land')
+    os.makedirs(daily_dir, exist_ok=True)
+    os.makedirs(land_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    for day in dates:
+        path = os.path.join(daily_dir, f'MERRA2_400.tavg1_2d_slv_Nx.{day:%Y%m%d}.nc4')
+        if not os.path.exists(path):
+            write_synthetic_file(path, WEATHER_VARIABLES, hours, day, rng)
+
+    for month in sorted({(day.year, day.month) for day in dates}):
+        path = os.path.join(land_dir, f'MERRA2_400.tavgM_2d_lnd_Nx.{month[0]}{month[1]:02d}.nc4')
+        if not os.path.exists(path):
+            write_synthetic_file(path, LAND_VARIABLES, 1, date(month[0], month[1], 1), rng)
+
+    return daily_dir, land_dir
+
+# Same calendar days over several years, so futureWeather has more than one year to average
+def synthetic_dates(years, days):
+    start = date(2000, 6, 1)
+    return [date(year, start.month, start.day) + timedelta(days=offset) for year in years for offset in range(days)]
+
+# Synthetic NFDB table, some wildfires fall outside the validity window or have an unknown day like the real data
+def generate_nfdb(path, rows, dates, seed=0):
+    rng = np.random.default_rng(seed)
+    picked = [dates[i] for i in rng.integers(0, len(dates), rows)]
+    fire_data = pd.DataFrame({
+        'FID': np.arange(rows),
+        'LATITUDE': rng.uniform(20, 75, rows).round(4),
+        'LONGITUDE': rng.uniform(-140, -50, rows).round(4),
+        'YEAR': [day.year for day in picked],
+        'MONTH': [day.month for day in picked],
+        'DAY': np.where(rng.random(rows) < 0.02, 0, [day.day for day in picked]),
+        'SIZE_HA': np.exp(rng.normal(0, 2.5, rows)).round(2),
+        'CAUSE': rng.choice(['H', 'N', 'U'], rows),
+        'CAUSE2': rng.choice(['A', 'B', 'C'], rows),
+    })
+    fire_data.to_csv(path, index=False)
+    return path
+
+# Random model features and log sizes, the same rows for both regression benchmarks
+def synthetic_features(rows, seed=0):
+    from merra2_grid import FEATURE_COLUMNS
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    y = X.to_numpy() @ rng.normal(size=len(FEATURE_COLUMNS)) + rng.normal(size=rows)
+    return X, pd.Series(y, name='LOG_SIZE_HA')
+
+# Set up one benchmark in the current process, returns a function that runs the timed operation and returns the number of rows processed
+# Imports and data loading happen here, so they are not part of the measured time
+def prepare_benchmark(name, daily_dir, nfdb_path, rows):
+    from weather import NFDB_COLUMNS, associate_weather, associate_weather_parallel, index_files_by_date
+
+    if name == 'index_files_by_date':
+        # Index from scratch, the JSON cache would otherwise make this a single file read
+        return lambda: len(index_files_by_date(daily_dir, cache=False))
+
+    if name == 'regression_fit':
+        from streaming_regression import StreamingRegression
+        X, y = synthetic_features(rows)
+
+        def run():
+            StreamingRegression().update(X, y).fit()
+            return rows
+        return run
+
+    if name == 'regression_fit_in_memory':
+        # Same pipeline as logarithmicRegression.py, the baseline the streaming fit is compared against
+        import statsmodels.api as sm
+        from sklearn.decomposition import PCA
+        from sklearn.preprocessing import StandardScaler
+        X, y = synthetic_features(rows)
+
+        def run():
+            scaled_X = StandardScaler().fit_transform(X)
+            pca_X = PCA(n_components=0.95).fit_transform(scaled_X)
+            sm.OLS(y, sm.add_constant(pca_X)).fit()
+            return rows
+        return run
+
+    date_index = index_files_by_date(daily_dir, cache=False)
+    fire_data = pd.read_csv(nfdb_path, nrows=rows, dtype=NFDB_COLUMNS)
+
+    if name == 'pastWeather':
+        from pastWeather import pastWeather
+
+        def run():
+            for fire in fire_data.itertuples():
+                pastWeather(str(fire.YEAR), str(fire.MONTH), str(fire.DAY), fire.LATITUDE, fire.LONGITUDE, date_index)
+            return len(fire_data)
+        return run
+
+    if name == 'futureWeather':
+        from futureWeather import futureWeather
+
+        def run():
+            for fire in fire_data.itertuples():
+                futureWeather(fire.MONTH, fire.DAY, fire.LATITUDE, fire.LONGITUDE, date_index)
+            return len(fire_data)
+        return run
+
+    if name == 'associate_weather':
+        return lambda: len(associate_weather(fire_data, date_index))
+
+    if name == 'associate_weather_parallel':
+        return lambda: len(associate_weather_parallel(fire_data, date_index))
+
+    raise ValueError(f"Unknown benchmark: {name}")
+
+# Time one benchmark, run in a fresh worker process so peak RSS and open files belong to this benchmark only
+def measure(name, daily_dir, nfdb_path, rows):
+    from instrumentation import metrics
+
+    run = prepare_benchmark(name, daily_dir, nfdb_path, rows)
+    metrics.reset()
+    start = time.perf_counter()
+    processed = run()
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS, worker processes of the parallel join count as children
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    peak_rss *= 1 if sys.platform == 'darwin' else 1024
+    return {
+        'benchmark': name,
+        'scale': rows,
+        'rows': processed,
+        'seconds': round(seconds, 6),
+        'rows_per_s': round(processed / seconds, 2) if seconds > 0 else None,
+        'peak_rss_mb': round(peak_rss / 1024**2, 1),
+        # Files opened by this process and, for the parallel join, by its workers, whose metrics are merged back
+        'files_opened': metrics.snapshot()['counters'].get('files_opened', 0),
+    }
+
+# Run every benchmark at every scale, returns the JSON report
+def run_suite(workdir, scales, benchmarks=BENCHMARKS, years=range(2001, 2004), days=30, hours=1):
+    dates = synthetic_dates(years, days)
+    daily_dir, _ = generate_merra2_files(workdir, dates, hours)
+    nfdb_path = generate_nfdb(os.path.join(workdir, 'nfdb.csv'), max(scales), dates)
+
+    results = []
+    for rows in scales:
+        for name in benchmarks:
+            # Indexing does not depend on the scale and the scalar functions are slow, so they only run at the smallest scale
+            if name in ('index_files_by_date', 'pastWeather', 'futureWeather') and rows != min(scales):
+                continue
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(measure, name, daily_dir, nfdb_path, rows).result()
+            print(f"{name:28s} {rows:>10d} rows {result['seconds']:10.3f} s {result['rows_per_s'] or 0:14.1f} rows/s {result['peak_rss_mb']:8.1f} MB {result['files_opened']:6d} files")
+            results.append(result)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'xarray': xr.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'data': {'daily_files': len(dates), 'hours_per_file': hours},
+        'results': results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the weather association and regression on synthetic MERRA2 data")
+    parser.add_argument('--workdir', default='benchmark_data', help="folder for the synthetic data, reused between runs")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000], help="numbers of wildfires to process")
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('--days', type=int, default=30, help="days of data per year")
+    parser.add_argument('--years', type=int, default=3, help="years of data, starting in 2001")
+    parser.add_argument('--hours', type=int, default=1, help="time steps per daily file, the real files have 24")
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+
+    report = run_suite(args.workdir, sorted(args.scales), args.benchmarks, range(2001, 2001 + args.years), args.days, args.hours)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Benchmark results written to", args.output)
@@ -0,0 +1,153 @@
+import os
+import sys
+import warnings
+import numpy as np
+from dataset_cache import open_date
+from interpolation import stencil_index
+from merra2_grid import LAND_VARIABLES, in_window, crop_to_window
+
+# Variables stored in the climatology cube, in the order futureWeather returns them
+CLIMATOLOGY_VARIABLES = ['QV2M', 'T2M', 'TQI', 'TQL', 'TQV', 'WIND']
+
+# Years of weather data averaged into the climatology
+CLIMATOLOGY_YEARS = range(1980, 2025)
+
+# First day-of-year slot of each month, using a leap year so February 29th has a slot
+MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+MONTH_LENGTHS = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# Check which month and day values form a real calendar date (February 29th included)
+def valid_month_day(month, day):
+    month = np.asarray(month, dtype=float)
+    day = np.asarray(day, dtype=float)
+    whole = (month == np.round(month)) & (day == np.round(day))
+    month_index = np.where(whole & (month >= 1) & (month <= 12), month, 1).astype(int) - 1
+    return whole & (month >= 1) & (month <= 12) & (day >= 1) & (day <= np.asarray(MONTH_LENGTHS)[month_index])
+
+# Convert month and day values to day-of-year slots (0-365), impossible dates raise rather than alias another day
+def day_of_year_slot(month, day):
+    if not np.all(valid_month_day(month, day)):
+        raise ValueError(f"Invalid month and day: {month}, {day}")
+    return MONTH_OFFSETS[np.asarray(month, dtype=int) - 1] + np.asarray(day, dtype=int) - 1
+
+# Read one day of weather data as a (lat, lon, variable) grid cropped to the validity window
+def read_daily_grid(data):
+    data = crop_to_window(data)
+
+    # Use the first time step, like pastWeather and futureWeather
+    grids = [data[name].values[0] for name in CLIMATOLOGY_VARIABLES[:-1]]
+
+    # Use the wind magnitude precomputed by the compact store, or calculate it from the raw file
+    if 'WIND' in data:
+        grids.append(data['WIND'].values[0])
+    else:
+        east_wind = data['U2M'].values[0]
+        north_wind = data['V2M'].values[0]
+        grids.append(np.sqrt(east_wind**2 + north_wind**2))
+
+    return np.stack(grids, axis=-1).astype(np.float64), data['lat'].values, data['lon'].values
+
+# Build the (day-of-year, lat, lon, variable) mean cube, reading every daily data file once
+def build_climatology(date_index, output_dir, years=CLIMATOLOGY_YEARS):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    cube = None
+    for month in range(1, 13):
+        for day in range(1, MONTH_LENGTHS[month - 1] + 1):
+            total = None
+            count = None
+
+            # Sum the weather for this calendar day over every year with data
+            for year in years:
+                data = open_date(date_index, str(year) + str(month).zfill(2) + str(day).zfill(2))
+                if data is None:
+                    continue
+
+                grid, lat, lon = read_daily_grid(data)
+                if cube is None:
+                    cube = np.lib.format.open_memmap(os.path.join(output_dir, 'climatology.npy'), mode='w+', dtype=np.float32, shape=(366, len(lat), len(lon), len(CLIMATOLOGY_VARIABLES)))
+                    cube[:] = np.nan
+                    np.savez(os.path.join(output_dir, 'coords.npz'), lat=lat, lon=lon, variables=CLIMATOLOGY_VARIABLES)
+                if total is None:
+                    total = np.zeros(grid.shape)
+                    count = np.zeros(grid.shape)
+                total += np.nan_to_num(grid)
+                count += ~np.isnan(grid)
+
+            # Average over the years, leaving NaN where no year had data
+            if total is not None:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    cube[day_of_year_slot(month, day)] = np.where(count > 0, total / count, np.nan)
+
+    if cube is not None:
+        cube.flush()
+    return cube
+
+# Build the (month, lat, lon, variable) mean cube of the monthly land surface data
+def build_land_climatology(month_index, output_dir, years=CLIMATOLOGY_YEARS):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    cube = None
+    for month in range(1, 13):
+        grids = []
+        for year in years:
+            data = open_date(month_index, str(year) + str(month).zfill(2))
+            if data is not None:
+                data = crop_to_window(data)
+                grids.append(np.stack([data[name].values[0] for name in LAND_VARIABLES], axis=-1))
+
+        # Average over the years, land variables are NaN over water in every year
+        if grids:
+            if cube is None:
+                cube = np.full((12,) + grids[0].shape, np.nan, dtype=np.float32)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                cube[month - 1] = np.nanmean(np.stack(grids), axis=0)
+
+    if cube is not None:
+        np.save(os.path.join(output_dir, 'land_climatology.npy'), cube)
+    return cube
+
+# Day-of-year weather climatology read from a memory-mapped cube, with the monthly land climatology when it was built
+class Climatology:
+    def __init__(self, path):
+        self.cube = np.load(os.path.join(path, 'climatology.npy'), mmap_mode='r')
+        coords = np.load(os.path.join(path, 'coords.npz'))
+        self.lat = coords['lat']
+        self.lon = coords['lon']
+        self.variables = list(coords['variables'])
+
+        land_path = os.path.join(path, 'land_climatology.npy')
+        self.land = np.load(land_path, mmap_mode='r') if os.path.exists(land_path) else None
+
+    # Bilinear lookup of the climatology for arrays of dates and locations, returns (points, variable)
+    def lookup(self, month, day, latitude, longitude):
+        latitude = np.atleast_1d(np.asarray(latitude, dtype=float))
+        longitude = np.atleast_1d(np.asarray(longitude, dtype=float))
+
+        # Impossible dates have no climatology, their slot is only a placeholder
+        valid_date = np.broadcast_to(valid_month_day(month, day), latitude.shape)
+        slot = np.zeros(latitude.shape, dtype=int)
+        slot[valid_date] = day_of_year_slot(np.broadcast_to(month, latitude.shape)[valid_date], np.broadcast_to(day, latitude.shape)[valid_date])
+
+        # Gather the four corners of every point from the cube and weight them
+        corners, weights = stencil_index(self.lat, self.lon).lookup(latitude, longitude)
+        values = self.cube[slot[:, None], corners // len(self.lon), corners % len(self.lon)]
+        values = (values * weights[:, :, None]).sum(axis=1)
+
+        # Locations outside the validity window have no climatology
+        values[~in_window(latitude, longitude) | ~valid_date] = np.nan
+        return values
+
+if __name__ == "__main__":
+    from file_index import index_files_by_date, index_files_by_month
+
+    # Usage: python climatology.py <data_dir> <output_dir> [land_data_dir]
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "Data"
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else "Climatology"
+    build_climatology(index_files_by_date(data_dir), output_dir)
+    if len(sys.argv) > 3:
+        build_land_climatology(index_files_by_month(sys.argv[3]), output_dir)
+    print("Climatology cube written to", output_dir)
@@ -0,0 +1,101 @@
+import os
+import sys
+import netCDF4
+import numpy as np
+import xarray as xr
+from merra2_grid import WEATHER_VARIABLES, LAND_VARIABLES, crop_to_window
+
+# Convert raw MERRA2 files into one cropped, float32, compressed store indexed by date
+def build_store(file_index, output_path, variables, wind=False):
+    temp_path = output_path + '.tmp'
+    store = None
+
+    try:
+        for key in sorted(file_index):
+            with xr.open_dataset(file_index[key][0], cache=False) as data:
+                data = crop_to_window(data[variables])
+
+                # Create the store from the grid of the first file
+                if store is None:
+                    store = netCDF4.Dataset(temp_path, 'w')
+                    store.key_format = 'YYYYMMDD' if len(key) == 8 else 'YYYYMM'
+                    store.createDimension('time', None)
+                    store.createDimension('lat', data.sizes['lat'])
+                    store.createDimension('lon', data.sizes['lon'])
+                    store.createVariable('time', 'i4', ('time',))
+                    store.createVariable('lat', 'f8', ('lat',))[:] = data['lat'].values
+                    store.createVariable('lon', 'f8', ('lon',))[:] = data['lon'].values
+                    chunks = (1, data.sizes['lat'], data.sizes['lon'])
+                    for name in variables + (['WIND'] if wind else []):
+                        store.createVariable(name, 'f4', ('time', 'lat', 'lon'), zlib=True, complevel=4, shuffle=True, chunksizes=chunks)
+
+                # Append the first time step, which is the one pastWeather and futureWeather read
+                position = len(store.dimensions['time'])
+                store['time'][position] = int(key)
+                for name in variables:
+                    store[name][position] = data[name].values[0].astype(np.float32)
+
+                # Precompute the wind magnitude
+                if wind:
+                    east_wind = data['U2M'].values[0]
+                    north_wind = data['V2M'].values[0]
+                    store['WIND'][position] = np.sqrt(east_wind**2 + north_wind**2).astype(np.float32)
+    finally:
+        if store is not None:
+            store.close()
+
+    if store is not None:
+        os.replace(temp_path, output_path)
+
+# Build the compact store of daily weather variables with precomputed wind magnitude
+def build_daily_store(date_index, output_path):
+    build_store(date_index, output_path, WEATHER_VARIABLES, wind=True)
+
+# Build the compact store of monthly land surface variables
+def build_land_store(month_index, output_path):
+    build_store(month_index, output_path, LAND_VARIABLES)
+
+# Reader for a compact store, usable in place of a raw {date_str: [paths]} index
+class CompactStore:
+    def __init__(self, path):
+        self.path = path
+        self.data = xr.open_dataset(path)
+        self.positions = {str(key): position for position, key in enumerate(self.data['time'].values)}
+
+    # Reopen the store in worker processes instead of pickling the open file
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    # Dates (or months) held in the store
+    def keys(self):
+        return self.positions.keys()
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    # Return the data for a date as a dataset with a single time step, or None if the date is missing
+    def open_date(self, date):
+        position = self.positions.get(date)
+        if position is None:
+            return None
+        return self.data.isel(time=slice(position, position + 1))
+
+    def close(self):
+        self.data.close()
+
+if __name__ == "__main__":
+    from file_index import index_files_by_date, index_files_by_month
+
+    # Usage: python compact_store.py daily <data_dir> <output.nc>
+    #        python compact_store.py land <data_dir> <output.nc>
+    kind, data_dir, output_path = sys.argv[1:4]
+    if kind == 'daily':
+        build_daily_store(index_files_by_date(data_dir), output_path)
+    elif kind == 'land':
+        build_land_store(index_files_by_month(data_dir), output_path)
+    else:
+        sys.exit("Store kind must be 'daily' or 'land'")
+    print("Compact store written to", output_path)
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+import xarray as xr
+from instrumentation import metrics
+
+# Bounded least-recently-used cache of open xarray datasets keyed by file path
+# The handle count is the bound, the optional byte cap limits the nominal decoded size of the open files
+# Files are opened lazily without caching, so that size is what a full read would take, not memory in use
+class DatasetCache:
+    def __init__(self, max_handles=64, max_bytes=None):
+        self.max_handles = max_handles
+        self.max_bytes = max_bytes
+        self.datasets = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    # Return the open dataset for a file, opening it only on a cache miss
+    def open(self, path):
+        with self.lock:
+            data = self.datasets.get(path)
+            if data is not None:
+                self.datasets.move_to_end(path)
+                self.hits += 1
+                metrics.count('cache_hits')
+                return data
+
+            self.misses += 1
+            metrics.count('files_opened')
+            with metrics.stage('open'):
+                data = xr.open_dataset(path, cache=False)
+            self.datasets[path] = data
+            self.sizes[path] = data.nbytes
+            self.total_bytes += data.nbytes
+            self._evict()
+            return data
+
+    # Close least recently used datasets until the cache is within both capacities
+    def _evict(self):
+        while len(self.datasets) > 1 and (len(self.datasets) > self.max_handles or (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            path, data = self.datasets.popitem(last=False)
+            self.total_bytes -= self.sizes.pop(path)
+            data.close()
+            self.evictions += 1
+
+    # Change the capacities, evicting immediately if the cache is now over them
+    def configure(self, max_handles=None, max_bytes=None):
+        with self.lock:
+            if max_handles is not None:
+                self.max_handles = max_handles
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    # Close every cached dataset
+    def clear(self):
+        with self.lock:
+            for data in self.datasets.values():
+                data.close()
+            self.datasets.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    # Hit, miss and eviction counters along with the current cache size
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'handles': len(self.datasets), 'bytes': self.total_bytes}
+
+# Cache shared by pastWeather and futureWeather
+dataset_cache = DatasetCache()
+
+# Open a data file through the shared cache
+def open_dataset(path):
+    return dataset_cache.open(path)
+
+# Open the data for a date from a raw {date_str: [paths]} index or from a compact store
+def open_date(date_index, date):
+    if hasattr(date_index, 'open_date'):
+        return date_index.open_date(date)
+
+    fileNames = date_index.get(date, [])
+    if fileNames:
+        return open_dataset(fileNames[0])
+    return None
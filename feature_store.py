@@ -0,0 +1,46 @@
+import sys
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from merra2_grid import FEATURE_COLUMNS, LAND_VARIABLES
+
+# Default location of the feature store
+STORE_DIR = 'feature_store'
+
+# Convert per-year fire data CSV files into a Parquet store partitioned by YEAR with float32 features
+def convert_csvs(csv_paths, store_dir=STORE_DIR):
+    for path in csv_paths:
+        data = pd.read_csv(path, sep=',', header=0)
+
+        # Failed land surface joins were written as -1, store them as missing instead
+        data[LAND_VARIABLES] = data[LAND_VARIABLES].replace(-1, np.nan)
+        data[FEATURE_COLUMNS] = data[FEATURE_COLUMNS].astype(np.float32)
+
+        # Missing values become nulls so loads can filter them without reading the data
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        ds.write_dataset(table, store_dir, format='parquet', partitioning=['YEAR'], partitioning_flavor='hive', existing_data_behavior='delete_matching')
+
+# Load fire data from the store, reading only the requested columns and rows
+def load_features(store_dir=STORE_DIR, columns=None, years=None, positive_size=True, complete=True):
+    dataset = ds.dataset(store_dir, format='parquet', partitioning='hive')
+
+    # Filters are pushed down to the partitions and row groups
+    conditions = []
+    if years is not None:
+        conditions.append((ds.field('YEAR') >= years[0]) & (ds.field('YEAR') <= years[1]))
+    if positive_size:
+        conditions.append(ds.field('SIZE_HA') > 0)
+    if complete:
+        conditions.extend(ds.field(name).is_valid() for name in FEATURE_COLUMNS)
+
+    condition = None
+    for part in conditions:
+        condition = part if condition is None else condition & part
+
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+if __name__ == "__main__":
+    # Usage: python feature_store.py <store_dir> fire_data_2014.csv ... fire_data_2023.csv
+    convert_csvs(sys.argv[2:], sys.argv[1])
+    print("Feature store written to", sys.argv[1])
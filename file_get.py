@@ -1,175 +1,293 @@
+import argparse
+import hashlib
+import json
 import os
+import threading
+import time
 import requests
-from getpass import getpass
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlparse
 
 username = os.getenv("EARTHDATA_USERNAME")
 password = os.getenv("EARTHDATA_PASSWORD")
 
 
-def download_merra2_files(url_list, output_dir, username, password):
+# HTTP status codes that send the client on to the Earthdata login
+REDIRECT_CODES = [301, 302, 303, 307, 308]
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
 
-    # Start a session that handles redirects and cookies
+def make_session(workers):
+    # Start a session that handles redirects and cookies, with a connection pool sized for the workers
     session = requests.Session()
     session.headers.update({'User-Agent': 'NASA-GESDISC-Downloader'})
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
-    for url in url_list:
-        filename = os.path.join(output_dir, os.path.basename(url))
-        print(f"📥 Downloading {url} → {filename}")
 
-        # Step 1: Try to access file (will redirect to login)
-        r1 = session.get(url, allow_redirects=False)
+class EarthdataLogin:
+    # Performs the URS login handshake once and shares the resulting cookies through the session
 
-        # Step 2: Follow redirect to URS login if needed
-        if r1.status_code in [301, 302, 303, 307, 308]:
-            login_url = r1.headers['Location']
+    def __init__(self, session, username, password):
+        self.session = session
+        self.username = username
+        self.password = password
+        self.lock = threading.Lock()
+        # Number of completed handshakes, a redirect seen under the current generation means the session expired
+        self.generation = 0
+
+    def login(self, response, generation):
+        with self.lock:
+            # Another worker logged in again after this one was redirected
+            if self.generation != generation:
+                return
 
             # Some links use relative redirect URLs
-            if login_url.startswith('/'):
-                login_url = "https://urs.earthdata.nasa.gov" + login_url
+            login_url = urljoin(response.url, response.headers['Location'])
 
-            # Step 3: Perform login
             print("🔑 Performing Earthdata login handshake...")
-            r2 = session.get(login_url, auth=(username, password), allow_redirects=True)
+            r = self.session.get(login_url, auth=(self.username, self.password), allow_redirects=True, stream=True, timeout=60)
+            r.close()
+            if r.status_code not in [200, 302]:
+                raise requests.HTTPError(f"Login failed (HTTP {r.status_code})")
+            self.generation += 1
+
+
+def total_size(response, offset):
+    # Expected size of the complete file from Content-Range (resumed) or Content-Length (full)
+    if response.status_code == 206:
+        content_range = response.headers.get('Content-Range', '')
+        if content_range.startswith(f'bytes {offset}-') and not content_range.endswith('/*'):
+            return int(content_range.rsplit('/', 1)[1])
+        raise IOError(f"Unexpected Content-Range '{content_range}' when resuming at byte {offset}")
+    if 'Content-Length' in response.headers:
+        return int(response.headers['Content-Length'])
+    return None
+
+
+def download_file(session, login, url, output_dir, retries=5, backoff=1.0):
+    filename = os.path.join(output_dir, os.path.basename(url))
+    partial = filename + '.part'
 
-            if r2.status_code not in [200, 302]:
-                print(f"⚠️ Login failed (HTTP {r2.status_code})")
-                continue
+    for attempt in range(retries + 1):
+        try:
+            # Resume from the end of any partial file left by an earlier attempt
+            offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
 
-            # Step 4: Now authenticated, retry the original file request
-            r3 = session.get(url, stream=True)
+            generation = login.generation
+            r = session.get(url, headers=headers, stream=True, allow_redirects=False, timeout=60)
 
-            if r3.status_code == 200:
-                with open(filename, 'wb') as f:
-                    for chunk in r3.iter_content(chunk_size=8192):
+            # Follow the redirect to the URS login if needed, then retry the original file request
+            if r.status_code in REDIRECT_CODES:
+                r.close()
+                login.login(r, generation)
+                r = session.get(url, headers=headers, stream=True, timeout=60)
+
+            with r:
+                # Sent on to the login page again (the session expired meanwhile), the next attempt logs in again
+                if urlparse(r.url).netloc != urlparse(url).netloc or r.headers.get('Content-Type', '').startswith('text/html'):
+                    raise IOError(f"Redirected to {r.url} instead of the file")
+
+                # The partial file is already as long as the server's copy, start over
+                if r.status_code == 416:
+                    os.remove(partial)
+                    raise IOError("Partial file does not match the server copy")
+
+                if r.status_code not in [200, 206]:
+                    raise requests.HTTPError(f"Failed to download file ({r.status_code})")
+
+                # A 200 means the server ignored the Range header and is sending the whole file
+                if r.status_code == 200:
+                    offset = 0
+                expected = total_size(r, offset)
+
+                with open(partial, 'ab' if offset else 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=1024 * 1024):
                         if chunk:
                             f.write(chunk)
-                print(f"✅ Saved: {filename}")
-            else:
-                print(f"❌ Failed to download file ({r3.status_code})")
-
-        elif r1.status_code == 200:
-            # Directly downloadable (already logged in or public)
-            with open(filename, 'wb') as f:
-                for chunk in r1.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+
+            # Only a complete file is renamed into place
+            size = os.path.getsize(partial)
+            if expected is not None and size != expected:
+                raise IOError(f"Incomplete transfer ({size} of {expected} bytes)")
+            os.replace(partial, filename)
             print(f"✅ Saved: {filename}")
+            return filename
 
-        else:
-            print(f"❌ Unexpected response {r1.status_code} for {url}")
+        except (requests.RequestException, IOError) as error:
+            if attempt == retries:
+                print(f"❌ Giving up on {url}: {error}")
+                return None
+
+            # Back off exponentially before the next attempt
+            delay = backoff * 2 ** attempt
+            print(f"⚠️ {error}, retrying {url} in {delay:.0f}s")
+            time.sleep(delay)
+
+
+def download_merra2_files(url_list, output_dir, username, password, workers=8, retries=5, backoff=1.0):
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # One pooled, authenticated session is shared by every worker
+    session = make_session(workers)
+    login = EarthdataLogin(session, username, password)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for url in url_list:
+            print(f"📥 Downloading {url} → {os.path.join(output_dir, os.path.basename(url))}")
+            futures[executor.submit(download_file, session, login, url, output_dir, retries, backoff)] = url
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
 
     print("🎉 All downloads complete.")
 
+    # Returns {url: saved path, or None if the download failed}
+    return results
+
+
+# Base URL of the GES DISC data archive
+ARCHIVE_URL = "https://data.gesdisc.earthdata.nasa.gov/data"
+
+# MERRA2 collections: archive directory, file name part and whether files are monthly or daily
+COLLECTIONS = {
+    'M2TMNXLND': {'directory': 'MERRA2_MONTHLY/M2TMNXLND.5.12.4', 'name': 'tavgM_2d_lnd_Nx', 'monthly': True},
+    'M2T1NXSLV': {'directory': 'MERRA2/M2T1NXSLV.5.12.4', 'name': 'tavg1_2d_slv_Nx', 'monthly': False},
+}
+
+# Months that were reprocessed and published under the MERRA2_401 stream
+STREAM_OVERRIDES = {'202009': 401, '202106': 401, '202107': 401, '202108': 401, '202109': 401}
+
+
+def stream_number(year, month):
+    # MERRA2 stream numbers follow the production decade of the data
+    override = STREAM_OVERRIDES.get(f"{year}{month:02d}")
+    if override:
+        return override
+    if year < 1992:
+        return 100
+    if year < 2001:
+        return 200
+    if year < 2011:
+        return 300
+    return 400
+
+
+def generate_urls(collection, start, end):
+    # Build the file URLs of a collection for every month (or day) from start to end, given as YYYY-MM or YYYY-MM-DD
+    info = COLLECTIONS[collection]
+    urls = []
+    if info['monthly']:
+        for month in date_range(start, end, monthly=True):
+            stream = stream_number(month.year, month.month)
+            urls.append(f"{ARCHIVE_URL}/{info['directory']}/{month.year}/MERRA2_{stream}.{info['name']}.{month:%Y%m}.nc4")
+    else:
+        for day in date_range(start, end, monthly=False):
+            stream = stream_number(day.year, day.month)
+            urls.append(f"{ARCHIVE_URL}/{info['directory']}/{day.year}/{day.month:02d}/MERRA2_{stream}.{info['name']}.{day:%Y%m%d}.nc4")
+    return urls
+
+
+def date_range(start, end, monthly):
+    # Every first of the month (or every day) between two YYYY-MM[-DD] dates, inclusive
+    current = datetime.strptime(start, '%Y-%m' if len(start) == 7 else '%Y-%m-%d')
+    last = datetime.strptime(end, '%Y-%m' if len(end) == 7 else '%Y-%m-%d')
+    if monthly:
+        current = current.replace(day=1)
+        last = last.replace(day=1)
+    elif len(end) == 7:
+        # A month given as the end of a daily range includes all of its days
+        last = (last.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    while current <= last:
+        yield current
+        if monthly:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1)
+
+
+def file_checksum(path):
+    # SHA-256 of a file, read in 1 MB blocks
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    # Returns {file name: {path, size, sha256, fetched_at}} or an empty manifest
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(output_dir, manifest):
+    # Write the manifest to a temporary file and rename it so a crash never leaves it half written
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def needs_download(output_dir, manifest, url, verify=False):
+    # A file is fetched when it is missing, not in the manifest, or differs from its manifest entry
+    name = os.path.basename(url)
+    entry = manifest.get(name)
+    path = os.path.join(output_dir, name)
+    if entry is None or not os.path.exists(path):
+        return True
+    if os.path.getsize(path) != entry['size']:
+        return True
+    return verify and file_checksum(path) != entry['sha256']
+
+
+def sync_merra2_files(collection, start, end, output_dir, username, password, workers=8, verify=False):
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # Only download the files that are missing or changed since the last sync
+    manifest = load_manifest(output_dir)
+    urls = [url for url in generate_urls(collection, start, end) if needs_download(output_dir, manifest, url, verify)]
+    if not urls:
+        print("✅ Everything is up to date.")
+        return {}
+
+    results = download_merra2_files(urls, output_dir, username, password, workers=workers)
+
+    # Record every downloaded file in the manifest
+    for url, path in results.items():
+        if path is not None:
+            manifest[os.path.basename(url)] = {
+                'path': path,
+                'size': os.path.getsize(path),
+                'sha256': file_checksum(path),
+                'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            }
+    save_manifest(output_dir, manifest)
+    return results
+
 
 
 if __name__ == "__main__":
-    # Example usage:
-    urls = [
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2015/MERRA2_400.tavgM_2d_lnd_Nx.201508.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2015/MERRA2_400.tavgM_2d_lnd_Nx.201509.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2015/MERRA2_400.tavgM_2d_lnd_Nx.201510.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2015/MERRA2_400.tavgM_2d_lnd_Nx.201511.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2015/MERRA2_400.tavgM_2d_lnd_Nx.201512.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201601.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201602.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201603.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201604.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201605.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201606.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201607.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201608.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201609.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201610.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201611.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2016/MERRA2_400.tavgM_2d_lnd_Nx.201612.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201701.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201702.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201703.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201704.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201705.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201706.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201707.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201708.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201709.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201710.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201711.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2017/MERRA2_400.tavgM_2d_lnd_Nx.201712.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201801.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201802.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201803.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201804.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201805.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201806.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201807.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201808.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201809.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201810.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201811.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2018/MERRA2_400.tavgM_2d_lnd_Nx.201812.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201901.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201902.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201903.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201904.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201905.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201906.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201907.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201908.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201909.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201910.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201911.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2019/MERRA2_400.tavgM_2d_lnd_Nx.201912.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202001.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202002.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202003.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202004.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202005.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202006.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202007.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202008.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_401.tavgM_2d_lnd_Nx.202009.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202010.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202011.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2020/MERRA2_400.tavgM_2d_lnd_Nx.202012.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202101.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202102.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202103.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202104.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202105.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_401.tavgM_2d_lnd_Nx.202106.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_401.tavgM_2d_lnd_Nx.202107.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_401.tavgM_2d_lnd_Nx.202108.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_401.tavgM_2d_lnd_Nx.202109.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202110.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202111.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2021/MERRA2_400.tavgM_2d_lnd_Nx.202112.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202201.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202202.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202203.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202204.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202205.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202206.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202207.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202208.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202209.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202210.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202211.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2022/MERRA2_400.tavgM_2d_lnd_Nx.202212.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202301.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202302.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202303.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202304.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202305.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202306.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202307.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202308.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202309.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202310.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202311.nc4",
-"https://data.gesdisc.earthdata.nasa.gov/data/MERRA2_MONTHLY/M2TMNXLND.5.12.4/2023/MERRA2_400.tavgM_2d_lnd_Nx.202312.nc4"
-    ]
-
-    output_folder = r"C:\Users\Maxcu\LizTakeover\Classes\CSCI4502\Project\merra2_data"
-    download_merra2_files(urls, output_folder, username, password)
+    # Example usage: python file_get.py M2TMNXLND 2015-08 2023-12 --output merra2_data
+    parser = argparse.ArgumentParser(description="Sync MERRA2 files from GES DISC into a local folder")
+    parser.add_argument('collection', choices=sorted(COLLECTIONS))
+    parser.add_argument('start', help="first month or day, as YYYY-MM or YYYY-MM-DD")
+    parser.add_argument('end', help="last month or day, as YYYY-MM or YYYY-MM-DD")
+    parser.add_argument('--output', default='merra2_data', help="folder holding the files and manifest.json")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--verify', action='store_true', help="also compare checksums of local files")
+    args = parser.parse_args()
+
+    sync_merra2_files(args.collection, args.start, args.end, args.output, username, password, workers=args.workers, verify=args.verify)
\ No newline at end of file
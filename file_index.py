@@ -0,0 +1,83 @@
+import json
+import os
+import re
+from collections import defaultdict
+
+# Define the date pattern as YYYYMMDD
+DATE_PATTERN = re.compile(r"\b(\d{8})\b")
+
+# Define the month pattern as YYYYMM between the dots of a MERRA2 file name
+MONTH_PATTERN = re.compile(r"\.(\d{6})\.")
+
+# Index data files by date
+def index_files_by_date(path, cache=True, verify=False):
+    # Returns {date_str: [paths]} format
+    return index_files(path, DATE_PATTERN, 'date_index', cache, verify)
+
+# Index monthly data files by month
+def index_files_by_month(path, cache=True, verify=False):
+    # Returns {month_str: [paths]} format
+    return index_files(path, MONTH_PATTERN, 'month_index', cache, verify)
+
+# Location of the on-disk index, kept beside the data directory so writing it does not change the directory mtime
+def index_cache_path(path, name):
+    return os.path.normpath(path) + '.' + name + '.json'
+
+# Index the files of a directory by the key their name matches, reusing and refreshing an on-disk index
+def index_files(path, pattern, name, cache=True, verify=False):
+    cache_path = index_cache_path(path, name)
+    mtime = os.stat(path).st_mtime_ns
+
+    # Load the previous index, {file name: [key, size]}
+    entries = {}
+    if cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached.get('pattern') == pattern.pattern:
+                entries = cached['files']
+        except (OSError, ValueError, KeyError):
+            entries = {}
+
+        # The directory has not changed since the index was written, so the index can be used as is
+        if entries and cached['mtime'] == mtime and not (verify and files_changed(path, entries)):
+            return build_index(path, entries)
+
+    # Loop through directory files, only matching names that are new or whose size changed
+    refreshed = {}
+    with os.scandir(path) as files:
+        for file in files:
+            size = file.stat().st_size
+            previous = entries.get(file.name)
+            if previous is not None and previous[1] == size:
+                refreshed[file.name] = previous
+                continue
+
+            # Search for the key pattern in files
+            matching_string = pattern.search(file.name)
+            if matching_string:
+                refreshed[file.name] = [matching_string.group(1), size]
+
+    if cache:
+        with open(cache_path + '.tmp', 'w') as f:
+            json.dump({'pattern': pattern.pattern, 'mtime': mtime, 'files': refreshed}, f)
+        os.replace(cache_path + '.tmp', cache_path)
+
+    return build_index(path, refreshed)
+
+# Check whether any indexed file is missing or has changed size
+def files_changed(path, entries):
+    for file_name, (key, size) in entries.items():
+        try:
+            if os.stat(os.path.join(path, file_name)).st_size != size:
+                return True
+        except OSError:
+            return True
+    return False
+
+# Turn {file name: [key, size]} entries into {key: [paths]}
+def build_index(path, entries):
+    index = defaultdict(list)
+    for file_name, (key, size) in entries.items():
+        index[key].append(os.path.join(path, file_name))
+    return index
@@ -1,10 +1,21 @@
 import numpy as np
-import xarray as xr
+import pandas as pd
+from climatology import valid_month_day
+from dataset_cache import open_date
+from interpolation import interp_points
+from merra2_grid import WEATHER_COLUMNS, WEATHER_VARIABLES, in_window
 
 # Predicts the future weather data associated with a specific date and location
-def futureWeather(month, day, latitude, longitude, date_index):
+def futureWeather(month, day, latitude, longitude, date_index, climatology=None):
     # Check that data is valid
-    if (month is not None and day is not None and latitude is not None and longitude is not None) and (latitude > 25 and latitude < 84) and (longitude > -172 and longitude < -52):
+    if (month is not None and day is not None and latitude is not None and longitude is not None) and (latitude > 25 and latitude < 84) and (longitude > -172 and longitude < -52) and valid_month_day(month, day):
+        # Read the averages from a precomputed climatology cube when one is given, a day without data gives None like below
+        if climatology is not None:
+            values = climatology.lookup(int(month), int(day), latitude, longitude)[0]
+            if np.isnan(values).all():
+                return None, None, None, None, None, None
+            return tuple(float(value) for value in values)
+
         specific_humidity = []
         temp = []
         precip_ice = []
@@ -31,15 +42,13 @@ def futureWeather(month, day, latitude, longitude, date_index):
 
         # Check the weather for each date
         for date in dates:
-            # Find each data file to read in from the indexed MERRA2 data files
-            fileNames = date_index.get(date, [])
-            if fileNames:
-                # Open the weather data file for the given date
-                data = xr.open_dataset(fileNames[0], cache=False)
+            # Open each weather data file from the indexed MERRA2 data files
+            data = open_date(date_index, date)
+            if data is not None:
                     # Variables are QV2M, T2M, TQI, TQL, TQV, U2M, V2M
 
                 # Read in data values for a wildfire using bilinear interpolation
-                data = data.interp(lat=latitude,lon=longitude)
+                data = interp_points(data, WEATHER_VARIABLES, latitude, longitude)
 
                 #QV2M:
                 #    standard_name:   2-meter_specific_humidity
@@ -49,7 +58,7 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #    fmissing_value:  1e+15
                 #    vmax:            1e+15
                 #    vmin:            -1e+15
-                specific_humidity.append(data['QV2M'].values[0])
+                specific_humidity.append(data['QV2M'][0])
 
                 # T2M:
                 #     standard_name:   2-meter_air_temperature
@@ -59,7 +68,7 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #     fmissing_value:  1e+15
                 #     vmax:            1e+15
                 #     vmin:            -1e+15
-                temp.append(data['T2M'].values[0])
+                temp.append(data['T2M'][0])
 
                 # TQI:
                 #     standard_name:   total_precipitable_ice_water
@@ -69,7 +78,7 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #     fmissing_value:  1e+15
                 #     vmax:            1e+15
                 #     vmin:            -1e+15
-                precip_ice.append(data['TQI'].values[0])
+                precip_ice.append(data['TQI'][0])
 
                 # TQL:
                 #     standard_name:   total_precipitable_liquid_water
@@ -79,7 +88,7 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #     fmissing_value:  1e+15
                 #     vmax:            1e+15
                 #     vmin:            -1e+15
-                precip_water.append(data['TQL'].values[0])
+                precip_water.append(data['TQL'][0])
 
                 # TQV:
                 #     standard_name:   total_precipitable_water_vapor
@@ -89,7 +98,7 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #     fmissing_value:  1e+15
                 #     vmax:            1e+15
                 #     vmin:            -1e+15
-                precip_vapor.append(data['TQV'].values[0])
+                precip_vapor.append(data['TQV'][0])
 
                 # U2M:
                 #     standard_name:   2-meter_eastward_wind
@@ -99,7 +108,7 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #     fmissing_value:  1e+15
                 #     vmax:            1e+15
                 #     vmin:            -1e+15
-                east_wind = data['U2M'].values[0]
+                east_wind = data['U2M'][0]
 
                 # V2M:
                 #     standard_name:   2-meter_northward_wind
@@ -109,12 +118,63 @@ def futureWeather(month, day, latitude, longitude, date_index):
                 #     fmissing_value:  1e+15
                 #     vmax:            1e+15
                 #     vmin:            -1e+15
-                north_wind = data['V2M'].values[0]
+                north_wind = data['V2M'][0]
 
                 # Calculate wind magnitude
                 wind.append(np.sqrt(east_wind**2 + north_wind**2))
 
+        # No year had data for this date
+        if not specific_humidity:
+            return None, None, None, None, None, None
+
         # Return the average weather values over all years of data
         return sum(specific_humidity)/len(specific_humidity), sum(temp)/len(temp), sum(precip_ice)/len(precip_ice), sum(precip_water)/len(precip_water), sum(precip_vapor)/len(precip_vapor), sum(wind)/len(wind)
     else:
-        return None, None, None, None, None, None
\ No newline at end of file
+        return None, None, None, None, None, None
+
+# Predicts the future weather data for arrays of dates and locations, returns a DataFrame of averaged values
+def futureWeatherBatch(months, days, latitudes, longitudes, date_index, climatology=None):
+    months = np.atleast_1d(np.asarray(months, dtype=float))
+    days = np.atleast_1d(np.asarray(days, dtype=float))
+    latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+    longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+
+    # Locations and dates that cannot be matched keep NaN for every variable
+    results = np.full((len(latitudes), len(WEATHER_COLUMNS)), np.nan)
+
+    # Check that data is valid
+    valid = in_window(latitudes, longitudes) & valid_month_day(months, days)
+
+    # Read the averages from a precomputed climatology cube when one is given
+    if climatology is not None:
+        if valid.any():
+            results[valid] = climatology.lookup(months[valid], days[valid], latitudes[valid], longitudes[valid])
+        return pd.DataFrame(results, columns=WEATHER_COLUMNS)
+
+    # Points sharing a month and day read the same data files
+    dates = pd.Series(months * 100 + days)[valid]
+    for month_day, positions in dates.groupby(dates).indices.items():
+        positions = np.flatnonzero(valid)[positions]
+        month = str(int(month_day) // 100).zfill(2)
+        day = str(int(month_day) % 100).zfill(2)
+
+        total = np.zeros((len(positions), len(WEATHER_COLUMNS)))
+        count = 0
+
+        # Interpolate every point once per year of data
+        for year in range(1980, 2025):
+            data = open_date(date_index, str(year)+month+day)
+            if data is not None:
+                data = interp_points(data, WEATHER_VARIABLES, latitudes[positions], longitudes[positions])
+
+                # Variables are documented in futureWeather above
+                east_wind = data['U2M']
+                north_wind = data['V2M']
+                total += np.column_stack([data['QV2M'], data['T2M'], data['TQI'], data['TQL'], data['TQV'], np.sqrt(east_wind**2 + north_wind**2)])
+                count += 1
+
+        # Average over all years of data, leaving NaN when no year matched
+        if count:
+            results[positions] = total / count
+
+    return pd.DataFrame(results, columns=WEATHER_COLUMNS)
\ No newline at end of file
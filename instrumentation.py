@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Per-stage wall clock timers and event counters, cheap enough to leave on in production runs
+class Metrics:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    # Time a block of work under a stage name
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.seconds[name] += elapsed
+                self.calls[name] += 1
+
+    # Add to an event counter
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += int(amount)
+
+    # Timers and counters collected so far
+    def snapshot(self):
+        with self.lock:
+            return {
+                'stages': {name: {'seconds': round(self.seconds[name], 6), 'calls': self.calls[name]} for name in self.seconds},
+                'counters': dict(self.counters),
+            }
+
+    # Return the timers and counters collected so far and clear them, used to ship worker metrics back
+    # The start time is kept, so an in-process drain and merge leaves the wall time intact
+    def drain(self):
+        with self.lock:
+            snapshot = {
+                'stages': {name: {'seconds': self.seconds[name], 'calls': self.calls[name]} for name in self.seconds},
+                'counters': dict(self.counters),
+            }
+            self._clear()
+        return snapshot
+
+    # Add a snapshot (from a worker process) to these metrics
+    def merge(self, snapshot):
+        with self.lock:
+            for name, stage in snapshot['stages'].items():
+                self.seconds[name] += stage['seconds']
+                self.calls[name] += stage['calls']
+            for name, value in snapshot['counters'].items():
+                self.counters[name] += value
+
+    # Clear every timer and counter and restart the wall clock
+    def reset(self):
+        with self.lock:
+            self._clear()
+            self.started = time.perf_counter()
+
+    def _clear(self):
+        self.seconds.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    # Write the metrics as JSON, along with the wall time since the metrics were started
+    def write(self, path):
+        report = self.snapshot()
+        report['wall_seconds'] = round(time.perf_counter() - self.started, 6)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+# Metrics shared by the association pipeline
+metrics = Metrics()
+
+# Progress line with throughput and estimated time left, printed every `every` items
+class Progress:
+    def __init__(self, total, label="Wildfires scanned", every=1000):
+        self.total = total
+        self.label = label
+        self.every = every
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def update(self, amount):
+        previous = self.done
+        self.done += amount
+        if self.done // self.every > previous // self.every or self.done == self.total:
+            elapsed = time.perf_counter() - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            eta = (self.total - self.done) / rate if rate > 0 else 0.0
+            print(f"{self.label}: {self.done} / {self.total} - {rate:.0f}/s - ETA {format_duration(eta)}")
+
+# Format seconds as H:MM:SS
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+# Profile a block with cProfile (stats file) or pyinstrument (HTML report), does nothing when no path is given
+@contextmanager
+def profiled(path=None, profiler='cprofile'):
+    if path is None:
+        yield
+        return
+
+    if profiler == 'pyinstrument':
+        # Optional dependency, only needed when asked for
+        from pyinstrument import Profiler
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(path, 'w') as f:
+                f.write(profile.output_html())
+        return
+
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,63 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import xarray as xr
+from dataset_cache import open_date
+from file_index import index_files_by_month
+from merra2_grid import LAND_VARIABLES
+
+# Group wildfires by their YYYYMM month, returns {month_str: row positions}
+def group_fires_by_month(fire_data):
+    year = pd.to_numeric(fire_data['YEAR'], errors='coerce').astype(float)
+    month = pd.to_numeric(fire_data['MONTH'], errors='coerce').astype(float)
+
+    # Wildfires with an incomplete date are left out of every group
+    months = (year * 100 + month).reset_index(drop=True)
+    groups = months.groupby(months).indices
+    return {str(int(key)): positions for key, positions in groups.items()}
+
+# Check which coordinates lie within half a grid cell of an axis, NaN coordinates are never covered
+def covered_by_grid(axis, values):
+    half_step = (axis[1] - axis[0]) / 2
+    return np.abs(values - np.clip(values, axis[0], axis[-1])) <= half_step
+
+# Associate monthly land surface data with every wildfire, opening each monthly data file once
+def associate_land_surface(fire_data, month_index):
+    latitudes = pd.to_numeric(fire_data['LATITUDE'], errors='coerce').to_numpy(dtype=float)
+    longitudes = pd.to_numeric(fire_data['LONGITUDE'], errors='coerce').to_numpy(dtype=float)
+
+    # Wildfires without land surface data keep NaN rather than a -1 sentinel
+    columns = np.full((len(fire_data), len(LAND_VARIABLES)), np.nan)
+
+    for month, positions in group_fires_by_month(fire_data).items():
+        data = open_date(month_index, month)
+        if data is None:
+            continue
+
+        # Only wildfires within half a grid cell of the data (a cropped store covers less than the globe)
+        positions = positions[covered_by_grid(data['lat'].values, latitudes[positions]) & covered_by_grid(data['lon'].values, longitudes[positions])]
+        if not len(positions):
+            continue
+
+        # Select the nearest grid cell of every wildfire for all variables at once
+        points_lat = xr.DataArray(latitudes[positions], dims='points')
+        points_lon = xr.DataArray(longitudes[positions], dims='points')
+        nearest = data[LAND_VARIABLES].isel(time=0).sel(lat=points_lat, lon=points_lon, method='nearest')
+        columns[positions] = np.column_stack([nearest[name].values for name in LAND_VARIABLES])
+
+    for i, name in enumerate(LAND_VARIABLES):
+        fire_data[name] = columns[:, i]
+    return fire_data
+
+if __name__ == "__main__":
+    from compact_store import CompactStore
+
+    # Usage: python land_surface.py <fire_data.csv> <land data folder or compact store> <output.csv>
+    fire_path, land_path, output_path = sys.argv[1:4]
+    month_index = CompactStore(land_path) if os.path.isfile(land_path) else index_files_by_month(land_path)
+
+    fire_data = pd.read_csv(fire_path, sep=',', header=0, dtype={'YEAR': 'str', 'MONTH': 'str', 'DAY': 'str'}, float_precision='round_trip')
+    fire_data = associate_land_surface(fire_data, month_index)
+    fire_data.to_csv(output_path, index=False, header=True)
+    print("Land surface association completed successfully!")
@@ -1,41 +1,28 @@
+import os
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 import statsmodels.api as sm
+from merra2_grid import FEATURE_COLUMNS, LAND_VARIABLES
+from scoring import FireSizeModel
 
-# Read in data
-data_2014 = pd.read_csv('fire_data_2014.csv', sep=',', header=0)
-data_2015 = pd.read_csv('fire_data_2015.csv', sep=',', header=0)
-data_2016 = pd.read_csv('fire_data_2016.csv', sep=',', header=0)
-data_2017 = pd.read_csv('fire_data_2017.csv', sep=',', header=0)
-data_2018 = pd.read_csv('fire_data_2018.csv', sep=',', header=0)
-data_2019 = pd.read_csv('fire_data_2019.csv', sep=',', header=0)
-data_2020 = pd.read_csv('fire_data_2020.csv', sep=',', header=0)
-data_2021 = pd.read_csv('fire_data_2021.csv', sep=',', header=0)
-data_2022 = pd.read_csv('fire_data_2022.csv', sep=',', header=0)
-data_2023 = pd.read_csv('fire_data_2023.csv', sep=',', header=0)
-
-# Concatenate and clean data
-data = pd.concat([data_2014, data_2015, data_2016, data_2017, data_2018, data_2019, data_2020, data_2021, data_2022, data_2023])
-data = data.dropna()
-data = data[data['SIZE_HA'] > 0]
-data = data[data['TSURF'] != -1]
-data = data[data['GWETTOP'] != -1]
-data = data[data['LHLAND'] != -1]
-data = data[data['SHLAND'] != -1]
-data = data[data['PRECTOTLAND'] != -1]
-data = data[data['LAI'] != -1]
-data = data[data['GRN'] != -1]
-data = data[data['SWLAND'] != -1]
-data = data[data['EVPTRNS'] != -1]
-data = data[data['RZMC'] != -1]
+# Read in data from the columnar feature store when it has been built, otherwise from the per-year CSV files
+if os.path.exists('feature_store'):
+    from feature_store import load_features
+    data = load_features('feature_store', columns=FEATURE_COLUMNS + ['SIZE_HA'], years=(2014, 2023))
+else:
+    data = pd.concat([pd.read_csv(f'fire_data_{year}.csv', sep=',', header=0) for year in range(2014, 2024)])
+
+    # Clean data with a single filter: positive sizes and no missing or -1 land surface values
+    data = data.dropna()
+    data = data[(data['SIZE_HA'] > 0) & (data[LAND_VARIABLES] != -1).all(axis=1)]
 
 # Take natural log of size data to reduce the effect of outliers            
 data['LOG_SIZE_HA'] = np.log(data['SIZE_HA'])
 
 # Select which data to use for independent and dependent variables
-X = data[['SPECIFIC_HUMIDITY','TEMP','PRECIP_ICE','PRECIP_WATER','PRECIP_VAPOR','WIND','TSURF','GWETTOP','LHLAND','SHLAND','PRECTOTLAND','LAI','GRN','SWLAND','EVPTRNS','RZMC']]
+X = data[FEATURE_COLUMNS]
 y = data['LOG_SIZE_HA']
 
 # Standardize features
@@ -63,6 +50,9 @@ model = sm.OLS(y, const_X).fit()
 # Print out OLS regression results
 print(model.summary())
 
+# Save the fitted scaler, PCA loadings and OLS coefficients for scoring without retraining
+FireSizeModel(FEATURE_COLUMNS, scaler.mean_, scaler.scale_, pca.components_, np.asarray(model.params)).save('fire_size_model.npz')
+
 # Get pca component names
 components = []
 for i in range(pca.n_components_):
@@ -0,0 +1,34 @@
+import numpy as np
+
+# Validity window used by pastWeather and futureWeather (North America)
+LAT_MIN = 25
+LAT_MAX = 84
+LON_MIN = -172
+LON_MAX = -52
+
+# MERRA2 grid spacing in degrees
+LAT_STEP = 0.5
+LON_STEP = 0.625
+
+# Daily MERRA2 variables read by pastWeather and futureWeather
+WEATHER_VARIABLES = ['QV2M', 'T2M', 'TQI', 'TQL', 'TQV', 'U2M', 'V2M']
+
+# Monthly MERRA2 land surface variables used by the regression
+LAND_VARIABLES = ['TSURF', 'GWETTOP', 'LHLAND', 'SHLAND', 'PRECTOTLAND', 'LAI', 'GRN', 'SWLAND', 'EVPTRNS', 'RZMC']
+
+# Names of the weather columns added to the fire data
+WEATHER_COLUMNS = ['SPECIFIC_HUMIDITY', 'TEMP', 'PRECIP_ICE', 'PRECIP_WATER', 'PRECIP_VAPOR', 'WIND']
+
+# Check which locations fall inside the validity window
+def in_window(latitudes, longitudes):
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    return (latitudes > LAT_MIN) & (latitudes < LAT_MAX) & (longitudes > LON_MIN) & (longitudes < LON_MAX)
+
+# Crop a MERRA2 dataset to the validity window, keeping one grid cell of margin for interpolation
+def crop_to_window(data):
+    return data.sel(lat=slice(LAT_MIN - LAT_STEP, LAT_MAX + LAT_STEP), lon=slice(LON_MIN - LON_STEP, LON_MAX + LON_STEP))
+
+
+# Model features, in the order logarithmicRegression uses them
+FEATURE_COLUMNS = WEATHER_COLUMNS + LAND_VARIABLES
\ No newline at end of file
@@ -1,5 +1,8 @@
 import numpy as np
-import xarray as xr
+from dataset_cache import open_date
+from instrumentation import metrics
+from interpolation import interp_points
+from merra2_grid import WEATHER_VARIABLES, in_window
 
 # Returns the weather data associated with a specific date and location
 def pastWeather(year, month, day, latitude, longitude, date_index):
@@ -12,15 +15,13 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             day = '0'+day
         date = year+month+day
 
-        # Find the data file to read in from the indexed MERRA2 data files
-        fileNames = date_index.get(date, [])
-        if fileNames:
-            # Open the weather data file for the given date
-            data = xr.open_dataset(fileNames[0], cache=False)
+        # Open the weather data file for the given date from the indexed MERRA2 data files
+        data = open_date(date_index, date)
+        if data is not None:
                 # Variables are QV2M, T2M, TQI, TQL, TQV, U2M, V2M
 
             # Read in data values for a wildfire using bilinear interpolation
-            data = data.interp(lat=latitude,lon=longitude)
+            data = interp_points(data, WEATHER_VARIABLES, latitude, longitude)
 
             #QV2M:
             #    standard_name:   2-meter_specific_humidity
@@ -30,7 +31,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #    fmissing_value:  1e+15
             #    vmax:            1e+15
             #    vmin:            -1e+15
-            specific_humidity = data['QV2M'].values[0]
+            specific_humidity = data['QV2M'][0]
 
             # T2M:
             #     standard_name:   2-meter_air_temperature
@@ -40,7 +41,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #     fmissing_value:  1e+15
             #     vmax:            1e+15
             #     vmin:            -1e+15
-            temp = data['T2M'].values[0]
+            temp = data['T2M'][0]
 
             # TQI:
             #     standard_name:   total_precipitable_ice_water
@@ -50,7 +51,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #     fmissing_value:  1e+15
             #     vmax:            1e+15
             #     vmin:            -1e+15
-            precip_ice = data['TQI'].values[0]
+            precip_ice = data['TQI'][0]
 
             # TQL:
             #     standard_name:   total_precipitable_liquid_water
@@ -60,7 +61,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #     fmissing_value:  1e+15
             #     vmax:            1e+15
             #     vmin:            -1e+15
-            precip_water = data['TQL'].values[0]
+            precip_water = data['TQL'][0]
 
             # TQV:
             #     standard_name:   total_precipitable_water_vapor
@@ -70,7 +71,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #     fmissing_value:  1e+15
             #     vmax:            1e+15
             #     vmin:            -1e+15
-            precip_vapor = data['TQV'].values[0]
+            precip_vapor = data['TQV'][0]
 
             # U2M:
             #     standard_name:   2-meter_eastward_wind
@@ -80,7 +81,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #     fmissing_value:  1e+15
             #     vmax:            1e+15
             #     vmin:            -1e+15
-            east_wind = data['U2M'].values[0]
+            east_wind = data['U2M'][0]
 
             # V2M:
             #     standard_name:   2-meter_northward_wind
@@ -90,7 +91,7 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
             #     fmissing_value:  1e+15
             #     vmax:            1e+15
             #     vmin:            -1e+15
-            north_wind = data['V2M'].values[0]
+            north_wind = data['V2M'][0]
 
             # Calculate wind magnitude
             wind = np.sqrt(east_wind**2 + north_wind**2)
@@ -99,4 +100,43 @@ def pastWeather(year, month, day, latitude, longitude, date_index):
         else:
             return None, None, None, None, None, None
     else:
-        return None, None, None, None, None, None
\ No newline at end of file
+        return None, None, None, None, None, None
+
+# Returns the weather data for many wildfires that share a single date, using one vectorized interpolation
+def pastWeatherBatch(date, latitudes, longitudes, date_index):
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+
+    # Locations that cannot be matched keep NaN for every variable
+    specific_humidity = np.full(len(latitudes), np.nan)
+    temp = np.full(len(latitudes), np.nan)
+    precip_ice = np.full(len(latitudes), np.nan)
+    precip_water = np.full(len(latitudes), np.nan)
+    precip_vapor = np.full(len(latitudes), np.nan)
+    wind = np.full(len(latitudes), np.nan)
+
+    # Check that the locations are valid
+    valid = in_window(latitudes, longitudes)
+    metrics.count('rows_skipped_invalid_location', len(valid) - valid.sum())
+
+    # Open the weather data file for the given date once for all wildfires
+    data = open_date(date_index, date) if valid.any() else None
+    if data is None:
+        metrics.count('rows_missing_date', valid.sum())
+    else:
+        # Interpolate every wildfire location in one call using cached bilinear stencils
+        data = interp_points(data, WEATHER_VARIABLES, latitudes[valid], longitudes[valid])
+
+        # Variables are documented in pastWeather above
+        specific_humidity[valid] = data['QV2M']
+        temp[valid] = data['T2M']
+        precip_ice[valid] = data['TQI']
+        precip_water[valid] = data['TQL']
+        precip_vapor[valid] = data['TQV']
+        east_wind = data['U2M']
+        north_wind = data['V2M']
+
+        # Calculate wind magnitude
+        wind[valid] = np.sqrt(east_wind**2 + north_wind**2)
+
+    return specific_humidity, temp, precip_ice, precip_water, precip_vapor, wind
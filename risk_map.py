@@ -0,0 +1,73 @@
+import argparse
+import os
+import numpy as np
+import xarray as xr
+from climatology import Climatology, MONTH_LENGTHS, day_of_year_slot, valid_month_day
+from merra2_grid import FEATURE_COLUMNS, in_window
+from scoring import load_model
+
+# Predicts log fire size over the whole validity window from the climatology cubes and a fitted model
+class RiskMapper:
+    def __init__(self, climatology_dir, model_path):
+        self.climatology = Climatology(climatology_dir)
+        if self.climatology.land is None:
+            raise ValueError(f"{climatology_dir} has no land climatology, build it with climatology.py first")
+        self.model = load_model(model_path)
+
+        # Reorder the cube variables into the model's feature order once
+        variables = self.climatology.variables
+        self.weather_order = [variables.index(name) for name in ['QV2M', 'T2M', 'TQI', 'TQL', 'TQV', 'WIND']]
+        if self.model.feature_names != FEATURE_COLUMNS:
+            raise ValueError("The model was not fitted on the standard feature columns")
+
+        # Grid cells outside the validity window are left empty
+        lat_grid, lon_grid = np.meshgrid(self.climatology.lat, self.climatology.lon, indexing='ij')
+        self.outside = ~in_window(lat_grid, lon_grid)
+
+    # Predicted log fire size for every grid cell on a month and day
+    def risk_map(self, month, day):
+        weather = self.climatology.cube[day_of_year_slot(month, day)][..., self.weather_order]
+        land = self.climatology.land[month - 1]
+
+        # Score the whole grid with one affine transform
+        features = np.concatenate([weather, land], axis=-1)
+        log_size = self.model.predict_log_size(features.reshape(-1, len(FEATURE_COLUMNS))).reshape(self.outside.shape)
+        log_size[self.outside] = np.nan
+
+        return xr.DataArray(log_size.astype(np.float32), dims=('lat', 'lon'), coords={'lat': self.climatology.lat, 'lon': self.climatology.lon}, name='LOG_SIZE_HA', attrs={'long_name': 'predicted natural log of fire size', 'units': 'log(ha)', 'month': month, 'day': day})
+
+    # Write the map of a month and day as a tiled, compressed NetCDF file
+    def write_risk_map(self, month, day, output_dir):
+        path = os.path.join(output_dir, f"risk_{month:02d}{day:02d}.nc")
+        risk = self.risk_map(month, day)
+        tile = (min(64, risk.sizes['lat']), min(64, risk.sizes['lon']))
+        risk.to_netcdf(path, encoding={'LOG_SIZE_HA': {'zlib': True, 'complevel': 4, 'chunksizes': tile}})
+        return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate gridded predicted fire size maps from the climatology")
+    parser.add_argument('--climatology', default='Climatology')
+    parser.add_argument('--model', default='fire_size_model.npz')
+    parser.add_argument('--output', default='RiskMaps')
+    parser.add_argument('--month', type=int)
+    parser.add_argument('--day', type=int)
+    parser.add_argument('--all', action='store_true', help="write a map for every day of the year")
+    args = parser.parse_args()
+
+    # A single map needs a real calendar day, checked before the climatology and model are loaded
+    if not args.all:
+        if args.month is None or args.day is None:
+            parser.error("--month and --day are required unless --all is given")
+        if not valid_month_day(args.month, args.day):
+            parser.error(f"invalid month and day: {args.month} {args.day}")
+
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    mapper = RiskMapper(args.climatology, args.model)
+
+    if args.all:
+        dates = [(month, day) for month in range(1, 13) for day in range(1, MONTH_LENGTHS[month - 1] + 1)]
+    else:
+        dates = [(args.month, args.day)]
+    for month, day in dates:
+        print("Risk map written to", mapper.write_risk_map(month, day, args.output))
@@ -0,0 +1,34 @@
+import numpy as np
+
+# Fitted fire size model reduced to plain arrays, scoring needs only NumPy
+class FireSizeModel:
+    def __init__(self, feature_names, scaler_mean, scaler_scale, components, params):
+        self.feature_names = [str(name) for name in feature_names]
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self.components = np.asarray(components, dtype=np.float64)
+        self.params = np.asarray(params, dtype=np.float64)
+
+        # Fold the scaler, PCA projection and OLS into one affine transform: log size = features @ weights + intercept
+        slopes = self.components.T @ self.params[1:]
+        self.weights = slopes / self.scaler_scale
+        self.intercept = self.params[0] - self.scaler_mean @ self.weights
+
+    # Predict the natural log of fire size for a (rows, features) array or a DataFrame holding the feature columns
+    def predict_log_size(self, features):
+        if hasattr(features, 'columns'):
+            features = features[self.feature_names].to_numpy()
+        return np.asarray(features, dtype=np.float64) @ self.weights + self.intercept
+
+    # Save the model as plain arrays in an .npz file
+    def save(self, path):
+        np.savez(path, feature_names=np.array(self.feature_names), scaler_mean=self.scaler_mean, scaler_scale=self.scaler_scale, components=self.components, params=self.params)
+
+# Load a model saved with FireSizeModel.save
+def load_model(path):
+    with np.load(path) as arrays:
+        return FireSizeModel(arrays['feature_names'], arrays['scaler_mean'], arrays['scaler_scale'], arrays['components'], arrays['params'])
+
+# Predict the natural log of fire size with a loaded model
+def predict_log_size(features, model):
+    return model.predict_log_size(features)
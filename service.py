@@ -0,0 +1,324 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+from climatology import valid_month_day
+from dataset_cache import dataset_cache, open_date
+from futureWeather import futureWeatherBatch
+from instrumentation import metrics
+from interpolation import stencil_index
+from land_surface import associate_land_surface
+from merra2_grid import FEATURE_COLUMNS, LAND_VARIABLES, WEATHER_COLUMNS, WEATHER_VARIABLES, crop_to_window, in_window
+from pastWeather import pastWeatherBatch
+
+# Coalesces point lookups that share a key (a date) and arrive within a short window into one vectorized call
+# Only one batch runs at a time, so under load lookups keep joining the waiting batches instead of queueing one by one
+class Batcher:
+    def __init__(self, function, executor, window=0.002, max_size=4096):
+        self.function = function
+        self.executor = executor
+        self.window = window
+        self.max_size = max_size
+        self.pending = OrderedDict()
+        self.ready = set()
+        self.running = False
+        self.batches = 0
+        self.points = 0
+
+    # Queue one location under a key, returns that location's row of the batch result
+    async def submit(self, key, latitude, longitude):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = []
+            loop.call_later(self.window, self._expire, key, batch)
+        batch.append((latitude, longitude, future))
+        if len(batch) >= self.max_size:
+            self._expire(key, batch)
+        return await future
+
+    # Mark a batch as ready once its window has passed (or it is full)
+    def _expire(self, key, batch):
+        if self.pending.get(key) is batch:
+            self.ready.add(key)
+            self._dispatch()
+
+    # Run the oldest ready batch on the worker thread
+    def _dispatch(self):
+        if self.running:
+            return
+        key = next((key for key in self.pending if key in self.ready), None)
+        if key is None:
+            return
+        batch = self.pending.pop(key)
+        self.ready.discard(key)
+        self.running = True
+        self.batches += 1
+        self.points += len(batch)
+        latitudes = np.array([item[0] for item in batch])
+        longitudes = np.array([item[1] for item in batch])
+        task = asyncio.get_running_loop().run_in_executor(self.executor, self.function, key, latitudes, longitudes)
+        task.add_done_callback(lambda done: self._deliver(done, batch))
+
+    # Hand every caller its row, then start the next batch
+    def _deliver(self, done, batch):
+        self.running = False
+        self._dispatch()
+        error = done.exception()
+        for row, (_, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[row])
+
+# Date index that keeps the weather of recently used dates decoded in memory, cropped to the validity window
+# The data files are opened without caching, so without this every batch would decompress the global grids again
+class WarmDates:
+    def __init__(self, date_index, max_dates=256):
+        self.date_index = date_index
+        self.max_dates = max_dates
+        self.datasets = OrderedDict()
+
+    def keys(self):
+        return self.date_index.keys()
+
+    def __contains__(self, date):
+        return date in self.date_index
+
+    # Return the loaded data of a date, or None if the date is missing
+    def open_date(self, date):
+        if date in self.datasets:
+            self.datasets.move_to_end(date)
+            return self.datasets[date]
+
+        data = open_date(self.date_index, date)
+        if data is not None:
+            data = crop_to_window(data[WEATHER_VARIABLES]).load()
+        self.datasets[date] = data
+        if len(self.datasets) > self.max_dates:
+            self.datasets.popitem(last=False)
+        return data
+
+# Paths answered by the service besides /metrics
+ENDPOINTS = ['/weather', '/forecast', '/predict']
+
+# Convert a NumPy scalar for JSON, NaN is not valid JSON so locations without data get null
+def json_value(value):
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+# Weather, climatology and fire size lookups kept warm between requests
+class WeatherService:
+    def __init__(self, date_index, month_index=None, climatology=None, model=None, window=0.002, max_batch=4096, warm_dates=256):
+        self.date_index = WarmDates(date_index, warm_dates)
+        self.month_index = month_index
+        self.climatology = climatology
+        self.model = model
+        if model is not None and model.feature_names != FEATURE_COLUMNS:
+            raise ValueError("The model was not fitted on the standard feature columns")
+
+        # NetCDF reads are not thread safe, so every batch runs on one worker thread
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.weather_batcher = Batcher(self.observed_weather, self.executor, window, max_batch)
+        self.forecast_batcher = Batcher(self.forecast_weather, self.executor, window, max_batch)
+        self.predict_batcher = Batcher(self.predict, self.executor, window, max_batch)
+
+        # Latencies of recent requests in seconds
+        self.latencies = deque(maxlen=100000)
+        self.requests = 0
+        self.started = time.perf_counter()
+
+    # Weather of many locations on one YYYYMMDD date, shaped (points, weather columns)
+    def observed_weather(self, date, latitudes, longitudes):
+        return np.column_stack(pastWeatherBatch(date, latitudes, longitudes, self.date_index))
+
+    # Averaged weather of many locations on one (month, day), shaped (points, weather columns)
+    def forecast_weather(self, month_day, latitudes, longitudes):
+        month, day = month_day
+        return futureWeatherBatch(np.full(len(latitudes), month), np.full(len(latitudes), day), latitudes, longitudes, self.date_index, self.climatology).to_numpy()
+
+    # Land surface features of many locations, observed for a YYYYMMDD date or from the land climatology for a (month, day)
+    def land_features(self, key, latitudes, longitudes):
+        if isinstance(key, str):
+            fire_data = pd.DataFrame({'YEAR': key[:4], 'MONTH': key[4:6], 'LATITUDE': latitudes, 'LONGITUDE': longitudes})
+            return associate_land_surface(fire_data, self.month_index)[LAND_VARIABLES].to_numpy()
+
+        land = self.climatology.land[key[0] - 1]
+        corners, weights = stencil_index(self.climatology.lat, self.climatology.lon).lookup(latitudes, longitudes)
+        values = land[corners // len(self.climatology.lon), corners % len(self.climatology.lon)]
+        values = (values * weights[:, :, None]).sum(axis=1)
+        values[~in_window(latitudes, longitudes)] = np.nan
+        return values
+
+    # Predicted log fire size of many locations, returns (points, features + log size)
+    def predict(self, key, latitudes, longitudes):
+        if isinstance(key, str):
+            weather = self.observed_weather(key, latitudes, longitudes)
+        else:
+            weather = self.forecast_weather(key, latitudes, longitudes)
+        features = np.column_stack([weather, self.land_features(key, latitudes, longitudes)])
+        return np.column_stack([features, self.model.predict_log_size(features)])
+
+    # Check the parameters of a request, returns (latitude, longitude, key) or raises KeyError or ValueError
+    # The key is a YYYYMMDD date string or a (month, day) pair
+    def parse_request(self, path, query):
+        latitude = float(query['lat'])
+        longitude = float(query['lon'])
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+
+        if path == '/weather' or (path == '/predict' and 'date' in query):
+            date = query['date']
+            if len(date) != 8 or not date.isdigit():
+                raise ValueError("date must be YYYYMMDD")
+            datetime.strptime(date, '%Y%m%d')
+            return latitude, longitude, date
+
+        month_day = (int(query['month']), int(query['day']))
+        if not valid_month_day(*month_day):
+            raise ValueError(f"no such month and day: {month_day[0]}, {month_day[1]}")
+        return latitude, longitude, month_day
+
+    # Answer one checked request, returns (status, JSON body)
+    async def handle(self, path, latitude, longitude, key):
+        response = {'latitude': latitude, 'longitude': longitude}
+        if isinstance(key, str):
+            response['date'] = key
+        else:
+            response['month'], response['day'] = key
+
+        if path == '/weather':
+            values = await self.weather_batcher.submit(key, latitude, longitude)
+            response.update(zip(WEATHER_COLUMNS, values))
+
+        elif path == '/forecast':
+            values = await self.forecast_batcher.submit(key, latitude, longitude)
+            response.update(zip(WEATHER_COLUMNS, values))
+
+        elif path == '/predict':
+            if self.model is None:
+                return 503, {'error': "no model loaded, start the service with --model"}
+            if isinstance(key, str) and self.month_index is None:
+                return 503, {'error': "predictions for a date need land surface data, start the service with --land"}
+            if not isinstance(key, str) and (self.climatology is None or self.climatology.land is None):
+                return 503, {'error': "forecast predictions need a climatology with land surface data"}
+            values = await self.predict_batcher.submit(key, latitude, longitude)
+            response.update(zip(FEATURE_COLUMNS + ['LOG_SIZE_HA'], values))
+            response['SIZE_HA'] = float(np.exp(values[-1]))
+
+        return 200, {name: json_value(value) for name, value in response.items()}
+
+    # Request count, throughput, latency percentiles and batching statistics
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        batchers = {'weather': self.weather_batcher, 'forecast': self.forecast_batcher, 'predict': self.predict_batcher}
+        return {
+            'requests': self.requests,
+            'requests_per_s': round(self.requests / (time.perf_counter() - self.started), 2),
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+                'p99': round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+                'max': round(float(latencies.max()), 3) if len(latencies) else None,
+            },
+            'batches': {name: {'batches': batcher.batches, 'points': batcher.points, 'mean_size': round(batcher.points / batcher.batches, 2) if batcher.batches else None} for name, batcher in batchers.items()},
+            'dataset_cache': dataset_cache.stats(),
+            'pipeline': metrics.snapshot(),
+        }
+
+    # Serve HTTP/1.1 GET requests on one connection, keeping it open between requests
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                start = time.perf_counter()
+                lines = head.decode('latin-1').split('\r\n')
+                method, target, version = lines[0].split(' ', 2)
+                headers = {name.strip().lower(): value.strip() for name, value in (line.split(':', 1) for line in lines[1:] if ':' in line)}
+                if int(headers.get('content-length', 0)):
+                    await reader.readexactly(int(headers['content-length']))
+
+                url = urlsplit(target)
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                if method != 'GET':
+                    status, body = 405, {'error': "only GET is supported"}
+                elif url.path == '/metrics':
+                    status, body = 200, self.stats()
+                elif url.path not in ENDPOINTS:
+                    status, body = 404, {'error': f"unknown path {url.path}"}
+                else:
+                    try:
+                        request = self.parse_request(url.path, query)
+                    except (KeyError, ValueError) as error:
+                        status, body = 400, {'error': f"bad request: {error}"}
+                    else:
+                        # A failed batch answers its callers with an error instead of dropping the connection
+                        try:
+                            status, body = await self.handle(url.path, *request)
+                        except Exception as error:
+                            print("Request failed:", url.path, repr(error))
+                            status, body = 500, {'error': f"internal error: {error}"}
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                payload = json.dumps(body).encode()
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n' % (status, b'OK' if status == 200 else b'Error', len(payload), b'keep-alive' if keep_alive else b'close') + payload)
+                await writer.drain()
+
+                if url.path != '/metrics':
+                    self.requests += 1
+                    self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    from file_index import index_files_by_month
+    from weather import load_date_index
+
+    parser = argparse.ArgumentParser(description="Serve weather, climatology and fire size lookups over HTTP")
+    parser.add_argument('--data', default='Data', help="folder of daily MERRA2 files, or a compact store file")
+    parser.add_argument('--land', help="folder of monthly MERRA2 land surface files, or a compact store file")
+    parser.add_argument('--climatology', help="folder of a precomputed climatology cube")
+    parser.add_argument('--model', help="fitted fire size model saved by logarithmicRegression.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--batch-window-ms', type=float, default=2.0, help="how long a lookup waits for others on the same date")
+    parser.add_argument('--max-batch', type=int, default=4096)
+    parser.add_argument('--warm-dates', type=int, default=256, help="number of dates kept decoded in memory")
+    args = parser.parse_args()
+
+    # Load the indexes, climatology and model once, they stay warm for every request
+    date_index = load_date_index(args.data)
+    month_index = None
+    if args.land:
+        from compact_store import CompactStore
+        month_index = CompactStore(args.land) if os.path.isfile(args.land) else index_files_by_month(args.land)
+    climatology = None
+    if args.climatology:
+        from climatology import Climatology
+        climatology = Climatology(args.climatology)
+    model = None
+    if args.model:
+        from scoring import load_model
+        model = load_model(args.model)
+
+    service = WeatherService(date_index, month_index, climatology, model, args.batch_window_ms / 1000, args.max_batch, args.warm_dates)
+    asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,198 @@
+import sys
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Mean Earth radius in kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+# Default neighbourhood of the fire density features
+RADIUS_KM = 25
+LOOKBACK_YEARS = 10
+
+# Time-bounded queries are grouped into buckets of this many days, each searching only the wildfires in its time range
+BUCKET_DAYS = 365
+
+# Queries are answered in blocks so the neighbour pairs of dense areas stay bounded in memory
+QUERY_BLOCK = 20000
+
+# Names of the neighbourhood columns for a radius and lookback
+def neighbourhood_columns(radius_km=RADIUS_KM, lookback_years=LOOKBACK_YEARS):
+    return [f'FIRES_{radius_km:g}KM_{lookback_years:g}Y', f'BURNED_HA_{radius_km:g}KM_{lookback_years:g}Y', 'NEAREST_PAST_FIRE_KM']
+
+# Day number of every wildfire, a missing month or day falls back to the start (or end) of the known period
+def fire_days(fire_data, period_end=False):
+    year = pd.to_numeric(fire_data['YEAR'], errors='coerce').to_numpy(dtype=float)
+    month = pd.to_numeric(fire_data['MONTH'], errors='coerce').to_numpy(dtype=float)
+    day = pd.to_numeric(fire_data['DAY'], errors='coerce').to_numpy(dtype=float)
+    month_known = (month >= 1) & (month <= 12)
+    day_known = month_known & (day >= 1) & (day <= 31)
+
+    # Start of the known period, then move to its end when asked
+    dates = pd.to_datetime(pd.DataFrame({'year': year, 'month': np.where(month_known, month, 1), 'day': np.where(day_known, day, 1)}), errors='coerce')
+    if period_end:
+        dates = dates.where(day_known, dates + pd.offsets.MonthEnd(0))
+        dates = dates.where(month_known, dates + pd.offsets.YearEnd(0))
+    return (dates - pd.Timestamp('1970-01-01')).dt.days.to_numpy(dtype=float)
+
+# Unit vectors of locations, straight-line (chord) distance between them grows with great-circle distance
+def to_unit_vectors(latitudes, longitudes):
+    latitudes = np.radians(np.asarray(latitudes, dtype=float))
+    longitudes = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack([np.cos(latitudes) * np.cos(longitudes), np.cos(latitudes) * np.sin(longitudes), np.sin(latitudes)])
+
+# Convert between great-circle kilometres and chord lengths on the unit sphere
+def km_to_chord(distance_km):
+    return 2 * np.sin(np.minimum(distance_km / EARTH_RADIUS_KM, np.pi) / 2)
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord, 2) / 2)
+
+# KD-tree over historical wildfire locations with their dates and sizes, built once and queried in batches
+# Time-bounded queries only see wildfires dated in [day - lookback, day), so features never use information from the future
+class FireIndex:
+    def __init__(self, fire_data):
+        latitudes = pd.to_numeric(fire_data['LATITUDE'], errors='coerce').to_numpy(dtype=float)
+        longitudes = pd.to_numeric(fire_data['LONGITUDE'], errors='coerce').to_numpy(dtype=float)
+
+        # A wildfire with an unknown day only counts once its whole month (or year) has passed
+        days = fire_days(fire_data, period_end=True)
+        sizes = pd.to_numeric(fire_data['SIZE_HA'], errors='coerce').to_numpy(dtype=float)
+
+        # Wildfires without a location or year cannot be placed in space or time, the rest are sorted by day
+        keep = np.flatnonzero(~np.isnan(latitudes) & ~np.isnan(longitudes) & ~np.isnan(days))
+        keep = keep[np.argsort(days[keep], kind='stable')]
+        self.positions = keep
+        self.days = days[keep]
+        self.sizes = np.nan_to_num(sizes[keep])
+        self.points = to_unit_vectors(latitudes[keep], longitudes[keep])
+        self.tree = cKDTree(self.points)
+
+    def __len__(self):
+        return len(self.days)
+
+    # Query rows with the wildfires they may see, yields (query rows, first and last indexed wildfire, tree over them)
+    # Time-bounded queries are split into buckets that each build a small tree over the day-sorted wildfires of their range
+    def _buckets(self, count, days, lookback_days):
+        if days is None:
+            yield np.arange(count), 0, len(self), self.tree
+            return
+
+        buckets = np.floor(days / BUCKET_DAYS)
+        for bucket in np.unique(buckets[~np.isnan(buckets)]):
+            rows = np.flatnonzero(buckets == bucket)
+            earliest = -np.inf if lookback_days is None else days[rows].min() - lookback_days
+            first = np.searchsorted(self.days, earliest, side='left')
+            last = np.searchsorted(self.days, days[rows].max(), side='left')
+            if last > first:
+                yield rows, first, last, cKDTree(self.points[first:last])
+
+    # Keep the (query, wildfire) pairs dated in [day - lookback, day)
+    def _in_time(self, wildfires, days, lookback_days):
+        if days is None:
+            return np.ones(len(wildfires), dtype=bool)
+        mask = self.days[wildfires] < days
+        if lookback_days is not None:
+            mask &= self.days[wildfires] >= days - lookback_days
+        return mask
+
+    # All (query, wildfire, distance km) pairs within a radius, optionally only wildfires before each query day
+    def radius_pairs(self, latitudes, longitudes, radius_km, days=None, lookback_days=None):
+        points = to_unit_vectors(latitudes, longitudes)
+        days = None if days is None else np.asarray(days, dtype=float)
+        for rows, first, last, tree in self._buckets(len(points), days, lookback_days):
+            for start in range(0, len(rows), QUERY_BLOCK):
+                block = rows[start:start + QUERY_BLOCK]
+                pairs = cKDTree(points[block]).sparse_distance_matrix(tree, km_to_chord(radius_km), output_type='ndarray')
+                queries = block[pairs['i']]
+                wildfires = pairs['j'].astype(np.int64) + first
+                mask = self._in_time(wildfires, None if days is None else days[queries], lookback_days)
+                yield queries[mask], wildfires[mask], chord_to_km(pairs['v'][mask])
+
+    # Wildfires within a radius of each location, returns one array of row positions (into the indexed table) per location
+    def query_radius(self, latitudes, longitudes, radius_km, days=None, lookback_days=None):
+        found = [[] for _ in range(len(np.atleast_1d(latitudes)))]
+        for queries, wildfires, _ in self.radius_pairs(latitudes, longitudes, radius_km, days, lookback_days):
+            order = np.argsort(queries, kind='stable')
+            queries, wildfires = queries[order], self.positions[wildfires[order]]
+            starts = np.flatnonzero(np.r_[True, queries[1:] != queries[:-1]]) if len(queries) else []
+            for query, group in zip(queries[starts], np.split(wildfires, starts[1:])):
+                found[query].append(group)
+        return [np.concatenate(groups) if groups else np.empty(0, dtype=np.int64) for groups in found]
+
+    # Number of wildfires, their summed area and the nearest distance (inf when none) within a radius of each location
+    def radius_counts(self, latitudes, longitudes, radius_km, days=None, lookback_days=None):
+        counts = np.zeros(len(np.atleast_1d(latitudes)))
+        areas = np.zeros(len(counts))
+        nearest = np.full(len(counts), np.inf)
+        for queries, wildfires, distances in self.radius_pairs(latitudes, longitudes, radius_km, days, lookback_days):
+            counts += np.bincount(queries, minlength=len(counts))
+            areas += np.bincount(queries, weights=self.sizes[wildfires], minlength=len(counts))
+            np.minimum.at(nearest, queries, distances)
+        return counts, areas, nearest
+
+    # Distances (km) and row positions of the k nearest wildfires to each location, optionally only those before each query day
+    # Locations with fewer than k such wildfires get inf distances and -1 positions for the missing neighbours
+    def query_knn(self, latitudes, longitudes, k=1, days=None, lookback_days=None):
+        points = to_unit_vectors(latitudes, longitudes)
+        distances = np.full((len(points), k), np.inf)
+        positions = np.full((len(points), k), -1, dtype=np.int64)
+        days = None if days is None else np.asarray(days, dtype=float)
+
+        for rows, first, last, tree in self._buckets(len(points), days, lookback_days):
+            # Ask again with more candidates for the locations whose nearest wildfires fall outside their time window
+            pending = rows
+            candidates = k
+            while len(pending):
+                candidates = min(candidates, last - first)
+                chords, found = tree.query(points[pending], k=candidates)
+                chords, found = chords.reshape(len(pending), -1), found.reshape(len(pending), -1) + first
+                mask = self._in_time(found.ravel(), None if days is None else np.repeat(days[pending], candidates), lookback_days).reshape(found.shape)
+
+                # Candidates come in distance order, so the first k valid ones are the nearest
+                finished = (mask.sum(axis=1) >= k) | (candidates == last - first)
+                order = np.argsort(~mask[finished], axis=1, kind='stable')[:, :k]
+                valid = np.take_along_axis(mask[finished], order, axis=1)
+                done = pending[finished]
+                distances[done, :order.shape[1]] = np.where(valid, chord_to_km(np.take_along_axis(chords[finished], order, axis=1)), np.inf)
+                positions[done, :order.shape[1]] = np.where(valid, self.positions[np.take_along_axis(found[finished], order, axis=1)], -1)
+
+                pending = pending[~finished]
+                candidates *= 4
+
+        return distances, positions
+
+# Add historical fire density, burned area and distance to the nearest past wildfire to every wildfire
+def add_neighbourhood_features(fire_data, index, radius_km=RADIUS_KM, lookback_years=LOOKBACK_YEARS):
+    latitudes = pd.to_numeric(fire_data['LATITUDE'], errors='coerce').to_numpy(dtype=float)
+    longitudes = pd.to_numeric(fire_data['LONGITUDE'], errors='coerce').to_numpy(dtype=float)
+
+    # A wildfire with an unknown day is queried at the start of its month (or year)
+    days = fire_days(fire_data)
+    valid = ~np.isnan(latitudes) & ~np.isnan(longitudes) & ~np.isnan(days)
+    columns = np.full((len(fire_data), 3), np.nan)
+
+    lookback_days = lookback_years * 365.25
+    counts, areas, nearest = index.radius_counts(latitudes[valid], longitudes[valid], radius_km, days[valid], lookback_days)
+
+    # Only wildfires without an earlier neighbour inside the radius need a nearest neighbour search
+    far = np.flatnonzero(counts == 0)
+    nearest[far] = index.query_knn(latitudes[valid][far], longitudes[valid][far], 1, days[valid][far], lookback_days)[0][:, 0]
+    columns[valid] = np.column_stack([counts, areas, np.where(np.isinf(nearest), np.nan, nearest)])
+
+    for i, name in enumerate(neighbourhood_columns(radius_km, lookback_years)):
+        fire_data[name] = columns[:, i]
+    return fire_data
+
+if __name__ == "__main__":
+    # Usage: python spatial_index.py <NFDB point file> fire_data_2014.csv ... fire_data_2023.csv
+    # The index holds the whole NFDB history, the features are added to each fire data file in place
+    nfdb = pd.read_csv(sys.argv[1], sep=',', header=0, usecols=['LATITUDE', 'LONGITUDE', 'YEAR', 'MONTH', 'DAY', 'SIZE_HA'])
+    index = FireIndex(nfdb)
+    print("Indexed wildfires:", len(index))
+
+    for path in sys.argv[2:]:
+        fire_data = pd.read_csv(path, sep=',', header=0, float_precision='round_trip')
+        fire_data = add_neighbourhood_features(fire_data.drop(columns=neighbourhood_columns(), errors='ignore'), index)
+        fire_data.to_csv(path, index=False, header=True)
+        print("Neighbourhood features added to", path)
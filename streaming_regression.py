@@ -0,0 +1,154 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from merra2_grid import FEATURE_COLUMNS
+from scoring import FireSizeModel
+
+# Running statistics of the features and log size, merged partition by partition
+class StreamingRegression:
+    def __init__(self, feature_names=FEATURE_COLUMNS):
+        self.feature_names = list(feature_names)
+        size = len(self.feature_names) + 1
+
+        # Count, means and centered cross products of [features, target]
+        self.n = 0
+        self.mean = np.zeros(size)
+        self.scatter = np.zeros((size, size))
+
+        # Year partitions already merged, so the same year is never counted twice
+        self.years = set()
+
+    # Add one partition of data, merging its centered statistics so large means do not cost precision
+    def update(self, X, y):
+        values = np.column_stack([np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        n = len(values)
+        if n == 0:
+            return self
+        mean = values.mean(axis=0)
+        centered = values - mean
+        scatter = centered.T @ centered
+
+        total = self.n + n
+        delta = mean - self.mean
+        self.scatter += scatter + np.outer(delta, delta) * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+        return self
+
+    # Save the running statistics so a later year can be added without re-reading earlier ones
+    def save(self, path):
+        np.savez(path, n=self.n, mean=self.mean, scatter=self.scatter, feature_names=self.feature_names, years=sorted(self.years))
+
+    @classmethod
+    def load(cls, path):
+        stats = np.load(path)
+        model = cls(list(stats['feature_names']))
+        model.n = int(stats['n'])
+        model.mean = stats['mean']
+        model.scatter = stats['scatter']
+        # Statistics saved before the years were recorded have none
+        if 'years' in stats:
+            model.years = {int(year) for year in stats['years']}
+        return model
+
+    # Fit StandardScaler, PCA and OLS from the statistics, matching the in-memory pipeline
+    def fit(self, n_components=0.95):
+        p = len(self.feature_names)
+        n = self.n
+
+        # StandardScaler uses the population standard deviation
+        self.scaler_mean_ = self.mean[:p]
+        scale = np.sqrt(np.diag(self.scatter)[:p] / n)
+        scale[scale == 0] = 1
+        self.scaler_scale_ = scale
+
+        # PCA of the standardized features from their covariance matrix
+        covariance = self.scatter[:p, :p] / np.outer(scale, scale) / (n - 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues = np.clip(eigenvalues[order], 0, None)
+        eigenvectors = eigenvectors[:, order].T
+
+        # Keep enough components for the requested share of variance, like PCA(n_components=0.95)
+        ratio = eigenvalues / eigenvalues.sum()
+        if 0 < n_components < 1:
+            k = min(int(np.searchsorted(np.cumsum(ratio), n_components, side='right')) + 1, p)
+        else:
+            k = int(n_components)
+
+        # Same sign convention as scikit-learn: the largest loading of each component is positive
+        components = eigenvectors[:k]
+        signs = np.sign(components[np.arange(k), np.argmax(np.abs(components), axis=1)])
+        self.components_ = components * signs[:, None]
+        self.n_components_ = k
+        self.explained_variance_ = eigenvalues[:k]
+        self.explained_variance_ratio_ = ratio[:k]
+
+        # OLS of the target on a constant and the principal components from the normal equations
+        # The components are centered, so the constant is the target mean and separates from the slopes
+        feature_target = self.scatter[:p, p] / scale
+        gram = self.components_ @ (self.scatter[:p, :p] / np.outer(scale, scale)) @ self.components_.T
+        cross = self.components_ @ feature_target
+        slopes = np.linalg.solve(gram, cross)
+        self.params_ = np.concatenate([[self.mean[p]], slopes])
+
+        # Fit statistics
+        total_sum_squares = self.scatter[p, p]
+        residual_sum_squares = total_sum_squares - slopes @ cross
+        self.rsquared_ = 1 - residual_sum_squares / total_sum_squares
+        sigma_squared = residual_sum_squares / (n - k - 1)
+        self.bse_ = np.sqrt(np.concatenate([[sigma_squared / n], sigma_squared * np.diag(np.linalg.inv(gram))]))
+
+        # Overall predictive importance of each original variable
+        self.importance_ = pd.Series(self.components_.T @ slopes, index=self.feature_names)
+        return self
+
+    # Fitted model as plain arrays for scoring
+    def to_scoring_model(self):
+        return FireSizeModel(self.feature_names, self.scaler_mean_, self.scaler_scale_, self.components_, self.params_)
+
+# Yield (features, log size) for each year partition of the feature store
+def store_partitions(store_dir, years):
+    from feature_store import load_features
+    for year in years:
+        data = load_features(store_dir, columns=FEATURE_COLUMNS + ['SIZE_HA'], years=(year, year))
+        yield data[FEATURE_COLUMNS], np.log(data['SIZE_HA'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit the fire size regression one year partition at a time")
+    parser.add_argument('store_dir')
+    parser.add_argument('first_year', type=int)
+    parser.add_argument('last_year', type=int)
+    parser.add_argument('--stats', help="running statistics file, the given years are added to it when it exists")
+    parser.add_argument('--model', help="where to save the fitted model for scoring")
+    args = parser.parse_args()
+
+    if args.stats and os.path.exists(args.stats):
+        model = StreamingRegression.load(args.stats)
+    else:
+        model = StreamingRegression()
+    # Years already in the statistics are skipped, adding them again would double their weight
+    years = range(args.first_year, args.last_year + 1)
+    included = sorted(model.years.intersection(years))
+    if included:
+        print("Years already in the statistics, skipped:", included)
+    years = [year for year in years if year not in model.years]
+    for year, (X, y) in zip(years, store_partitions(args.store_dir, years)):
+        model.update(X, y)
+        model.years.add(year)
+    if args.stats:
+        model.save(args.stats)
+    model.fit()
+    if args.model:
+        model.to_scoring_model().save(args.model)
+    # Print out PCA results
+    print("--------------- Running principle component analysis ---------------")
+    print(f"Original features: {len(model.feature_names)}")
+    print(f"Principal components selected: {model.n_components_}")
+    print(f"Explained variance ratio (each component): {model.explained_variance_ratio_}")
+    print(f"Cumulative explained variance: {np.cumsum(model.explained_variance_ratio_)[-1]}")
+    print("--------------------------------------------------------------------\n")
+    print(f"Observations: {model.n}   R-squared: {model.rsquared_:.4f}")
+    print(f"Coefficients: {model.params_}")
+    print(f"\nEstimated relative importance of original variables:\n{model.importance_.sort_values(key=abs, ascending=False)}")
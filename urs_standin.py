@@ -0,0 +1,189 @@
+import base64
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Local stand-ins for the GES DISC archive and the Earthdata (URS) login, used to exercise file_get.py without the network
+# The archive redirects requests without a valid session cookie to the login, which redirects back with a code once the
+# credentials check out. Sessions can be made to expire and transfers to be cut off part way through.
+
+
+class StandInServers:
+    # Starts an archive and a login server on local ports, serving {path: bytes}
+
+    def __init__(self, files, username='user', password='pass', session_requests=None, cut_first_transfer=False):
+        self.files = dict(files)
+        self.credentials = base64.b64encode(f'{username}:{password}'.encode()).decode()
+        # Number of file requests a session cookie is valid for, None for no expiry
+        self.session_requests = session_requests
+        self.cut_first_transfer = cut_first_transfer
+        self.sessions = {}
+        self.codes = set()
+        self.cut_paths = set()
+        self.logins = 0
+        self.lock = threading.Lock()
+
+        self.archive = ThreadingHTTPServer(('127.0.0.1', 0), archive_handler(self))
+        self.urs = ThreadingHTTPServer(('127.0.0.1', 0), urs_handler(self))
+        self.archive_url = f'http://127.0.0.1:{self.archive.server_port}'
+        self.urs_url = f'http://127.0.0.1:{self.urs.server_port}'
+
+    def __enter__(self):
+        for server in (self.archive, self.urs):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        for server in (self.archive, self.urs):
+            server.shutdown()
+            server.server_close()
+
+    def url(self, path):
+        return self.archive_url + path
+
+    # Spend one request of a session, returns False when the cookie is missing or the session expired
+    def use_session(self, token):
+        with self.lock:
+            if token not in self.sessions:
+                return False
+            if self.session_requests is not None and self.sessions[token] >= self.session_requests:
+                del self.sessions[token]
+                return False
+            self.sessions[token] += 1
+            return True
+
+
+def session_token(handler):
+    for cookie in handler.headers.get('Cookie', '').split(';'):
+        name, _, value = cookie.strip().partition('=')
+        if name == 'session':
+            return value
+    return None
+
+
+def archive_handler(servers):
+    class ArchiveHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+
+            # Login callback: trade the code for a session cookie and send the client back to the file
+            if url.path == '/urs_callback':
+                query = parse_qs(url.query)
+                code = query.get('code', [''])[0]
+                with servers.lock:
+                    valid = code in servers.codes
+                    servers.codes.discard(code)
+                    if valid:
+                        servers.sessions[code] = 0
+                if not valid:
+                    self.send_error(401)
+                    return
+                self.send_response(302)
+                self.send_header('Set-Cookie', f'session={code}; Path=/')
+                self.send_header('Location', query.get('next', ['/'])[0])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if url.path not in servers.files:
+                self.send_error(404)
+                return
+
+            if not servers.use_session(session_token(self)):
+                self.send_response(302)
+                self.send_header('Location', servers.urs_url + '/oauth/authorize?' + urlencode({'redirect': self.path}))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            data = servers.files[url.path]
+            offset = 0
+            content_range = self.headers.get('Range', '')
+            if content_range.startswith('bytes=') and content_range.endswith('-'):
+                offset = int(content_range[6:-1])
+                if offset >= len(data):
+                    self.send_error(416)
+                    return
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {offset}-{len(data) - 1}/{len(data)}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(data) - offset))
+            self.end_headers()
+
+            # Cut the first transfer of every file off half way, like a dropped connection
+            with servers.lock:
+                cut = servers.cut_first_transfer and url.path not in servers.cut_paths
+                servers.cut_paths.add(url.path)
+            if cut:
+                self.wfile.write(data[offset:offset + (len(data) - offset) // 2])
+                self.close_connection = True
+                return
+            self.wfile.write(data[offset:])
+
+    return ArchiveHandler
+
+
+def urs_handler(servers):
+    class UrsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/oauth/authorize':
+                self.send_error(404)
+                return
+
+            # Without credentials the login answers with its HTML sign in page, as the real one does
+            if self.headers.get('Authorization') != 'Basic ' + servers.credentials:
+                page = b'<html><body>Earthdata Login</body></html>'
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+                return
+
+            code = secrets.token_hex(8)
+            with servers.lock:
+                servers.codes.add(code)
+                servers.logins += 1
+            redirect = parse_qs(url.query).get('redirect', ['/'])[0]
+            self.send_response(302)
+            self.send_header('Location', servers.archive_url + '/urs_callback?' + urlencode({'code': code, 'next': redirect}))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    return UrsHandler
+
+
+# Download a few files through the stand-in servers with expiring sessions and dropped transfers, checking every byte
+def check_downloader(workers=4, files=8, size=300000):
+    from file_get import download_merra2_files
+
+    contents = {f'/data/MERRA2_400.tavg1_2d_slv_Nx.200106{day:02d}.nc4': os.urandom(size) for day in range(1, files + 1)}
+    output_dir = tempfile.mkdtemp()
+    try:
+        with StandInServers(contents, session_requests=3, cut_first_transfer=True) as servers:
+            results = download_merra2_files([servers.url(path) for path in contents], output_dir, 'user', 'pass', workers=workers, backoff=0.01)
+        for path, data in contents.items():
+            saved = results[servers.url(path)]
+            assert saved is not None, f"{path} was not downloaded"
+            with open(saved, 'rb') as f:
+                assert f.read() == data, f"{path} does not match the served file"
+        print(f"Downloader check passed: {len(contents)} files, {servers.logins} logins")
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    check_downloader()
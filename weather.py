@@ -1,74 +1,329 @@
+import argparse
 import pandas as pd
 import os
-import re
-import time
 import numpy as np
-from pastWeather import pastWeather
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from compact_store import CompactStore
+from pastWeather import pastWeatherBatch
 from futureWeather import futureWeather
+from merra2_grid import WEATHER_COLUMNS
 from collections import defaultdict
+from file_index import index_files_by_date, index_files_by_month
+from instrumentation import Progress, metrics, profiled
 
 
-# Index data files by date
-def index_files_by_date(path):
-    date_index = defaultdict(list)
-
-    # Define the date pattern as YYYYMMDD
-    date_pattern = re.compile(r"\b(\d{8})\b")
-
-    # Loop through directory files
-    with os.scandir(path) as files:
-        for file in files:
-
-            # Search for YYYYMMDD date pattern in files
-            matching_string = date_pattern.search(file.name)
-
-            # If the date pattern is found, add the file path to the date index
-            if matching_string:
-                date = matching_string.group(1)
-                date_index[date].append(file.path)
-
-    # Returns {date_str: [paths]} format
-    return date_index
-
-# Index all the MERRA2 weather data files by date
-date_index = index_files_by_date("Data")
-
-# Predict an example future weather value
-month = 9
-day = 9
-latitude = 54.5692
-longitude = -126.9287
-specific_humidity, temp, precip_ice, precip_water, precip_vapor, wind = futureWeather(month, day, latitude, longitude, date_index)
-print("Predicted weather data:", specific_humidity, temp, precip_ice, precip_water, precip_vapor, wind)
-
-# Read in historical fire data as a dataframe
-fire_data = pd.read_csv('NFDB_point_txt/NFDB_point_20240613.txt', sep=',', header=0, dtype={'YEAR': 'str','MONTH': 'str','DAY': 'str', 12: str, 13: str})
-#fire_data = fire_data[fire_data['CAUSE'] == 'N'] # Do we want to filter by natural fires???
-fire_data['SPECIFIC_HUMIDITY'] = None
-fire_data['TEMP'] = None
-fire_data['PRECIP_ICE'] = None
-fire_data['PRECIP_WATER'] = None
-fire_data['PRECIP_VAPOR'] = None
-fire_data['WIND'] = None
-
-# For each historical fire, return the associated weather data
-num_fires = len(fire_data)
-for index, fire in fire_data.iterrows():
-    specific_humidity, temp, precip_ice, precip_water, precip_vapor, wind = pastWeather(fire['YEAR'], fire['MONTH'], fire['DAY'], fire['LATITUDE'], fire['LONGITUDE'], date_index)
-
-    # Associate the weather data to the data frame item
-    if specific_humidity is not None:
-        fire_data.at[index, 'SPECIFIC_HUMIDITY'] = specific_humidity
-        fire_data.at[index, 'TEMP'] = temp
-        fire_data.at[index, 'PRECIP_ICE'] = precip_ice
-        fire_data.at[index, 'PRECIP_WATER'] = precip_water
-        fire_data.at[index, 'PRECIP_VAPOR'] = precip_vapor
-        fire_data.at[index, 'WIND'] = wind
-
-    # Print wildfire index 1000 at a time to update progress
-    if index % 1000 == 0:
-        print("Wildfires scanned:", index, "/", num_fires)
-
-# Output associated fire data from a dataframe to a csv
-fire_data.to_csv('fire_data_processed.csv', index=False, header=True)
-print("Wildfire weather association completed successfully!")
\ No newline at end of file
+# Group wildfires by their YYYYMMDD date, returns {date_str: row positions}
+def group_fires_by_date(fire_data):
+    year = pd.to_numeric(fire_data['YEAR'], errors='coerce').astype(float)
+    month = pd.to_numeric(fire_data['MONTH'], errors='coerce').astype(float)
+    day = pd.to_numeric(fire_data['DAY'], errors='coerce').astype(float)
+
+    # Wildfires with an incomplete date are left out of every group
+    dates = year * 10000 + month * 100 + day
+    dates = dates.reset_index(drop=True)
+    groups = dates.groupby(dates).indices
+    return {str(int(date)): positions for date, positions in groups.items()}
+
+# Associate weather data to every wildfire, opening each daily data file only once
+def associate_weather(fire_data, date_index):
+    num_fires = len(fire_data)
+    latitudes = pd.to_numeric(fire_data['LATITUDE'], errors='coerce').to_numpy(dtype=float)
+    longitudes = pd.to_numeric(fire_data['LONGITUDE'], errors='coerce').to_numpy(dtype=float)
+
+    # Results are written straight into column arrays
+    columns = {name: np.full(num_fires, np.nan) for name in WEATHER_COLUMNS}
+
+    groups = group_fires_by_date(fire_data)
+    progress = Progress(num_fires)
+    metrics.count('rows_skipped_no_date', num_fires - sum(len(positions) for positions in groups.values()))
+    for date, positions in groups.items():
+        values = pastWeatherBatch(date, latitudes[positions], longitudes[positions], date_index)
+        with metrics.stage('store'):
+            for name, value in zip(WEATHER_COLUMNS, values):
+                columns[name][positions] = value
+
+        # Print wildfire progress 1000 at a time, with throughput and time left
+        progress.update(len(positions))
+
+    for name in WEATHER_COLUMNS:
+        fire_data[name] = columns[name]
+    return fire_data
+
+# Date index shared by the worker processes, set once per worker
+_worker_date_index = None
+
+def _init_worker(date_index, worker_process=True):
+    global _worker_date_index
+    _worker_date_index = date_index
+
+    # A forked worker inherits the parent's metrics, start from zero so they are not sent back and counted again
+    if worker_process:
+        metrics.reset()
+
+# Associate weather data for one shard of dates, returns compact (FIDs, values) blocks and the metrics of the shard
+def associate_shard(shard):
+    fids = []
+    blocks = []
+    for date, shard_fids, latitudes, longitudes in shard:
+        values = pastWeatherBatch(date, latitudes, longitudes, _worker_date_index)
+        fids.append(shard_fids)
+        blocks.append(np.column_stack(values))
+    return np.concatenate(fids), np.vstack(blocks), metrics.drain()
+
+# Split the wildfires into per-date or per-month shards of (date, FIDs, latitudes, longitudes)
+def shard_fires(fire_data, shard_by='month'):
+    fids = fire_data['FID'].to_numpy()
+    latitudes = pd.to_numeric(fire_data['LATITUDE'], errors='coerce').to_numpy(dtype=float)
+    longitudes = pd.to_numeric(fire_data['LONGITUDE'], errors='coerce').to_numpy(dtype=float)
+
+    shards = defaultdict(list)
+    groups = group_fires_by_date(fire_data)
+    metrics.count('rows_skipped_no_date', len(fire_data) - sum(len(positions) for positions in groups.values()))
+    for date, positions in groups.items():
+        key = date[:6] if shard_by == 'month' else date
+        shards[key].append((date, fids[positions], latitudes[positions], longitudes[positions]))
+    return list(shards.values())
+
+# Pool of worker processes that each hold the date index, reusable for many batches of shards
+def worker_pool(date_index, workers=None):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(date_index,))
+
+# Run shards in a pool of worker processes (or in this process for a single worker), yielding results as they finish
+# An existing pool from worker_pool can be given, otherwise one is started for these shards only
+def shard_results(shards, date_index, workers=None, executor=None):
+    # Metrics of every shard are merged back into this process, in-process shards drain and restore the same metrics
+    if executor is None and workers == 1:
+        _init_worker(date_index, worker_process=False)
+        for shard in shards:
+            fids, values, shard_metrics = associate_shard(shard)
+            metrics.merge(shard_metrics)
+            yield fids, values
+        return
+
+    if executor is None:
+        with worker_pool(date_index, workers) as executor:
+            yield from shard_results(shards, date_index, executor=executor)
+        return
+
+    futures = [executor.submit(associate_shard, shard) for shard in shards]
+    for future in as_completed(futures):
+        fids, values, shard_metrics = future.result()
+        metrics.merge(shard_metrics)
+        yield fids, values
+
+# Associate weather data to every wildfire using a pool of worker processes
+def associate_weather_parallel(fire_data, date_index, workers=None, shard_by='month', executor=None):
+    num_fires = len(fire_data)
+    fid_index = pd.Index(fire_data['FID'])
+    if not fid_index.is_unique:
+        raise ValueError("FID values must be unique to merge parallel results")
+
+    # Results are merged back into column arrays by FID
+    columns = np.full((num_fires, len(WEATHER_COLUMNS)), np.nan)
+
+    progress = Progress(num_fires)
+    for fids, values in shard_results(shard_fires(fire_data, shard_by), date_index, workers, executor):
+        with metrics.stage('store'):
+            columns[fid_index.get_indexer(fids)] = values
+
+        # Print wildfire progress 1000 at a time, with throughput and time left
+        progress.update(len(fids))
+
+    for i, name in enumerate(WEATHER_COLUMNS):
+        fire_data[name] = columns[:, i]
+    return fire_data
+
+# Columns that decide the weather associated with a wildfire
+INPUT_COLUMNS = ['YEAR', 'MONTH', 'DAY', 'LATITUDE', 'LONGITUDE']
+
+# Hash the weather-relevant input columns of every wildfire
+# Columns are cast to float64 so a blank value elsewhere in the file (which turns an int64 column into float64) does not change the hashes
+def input_hashes(fire_data):
+    values = fire_data[INPUT_COLUMNS].apply(pd.to_numeric, errors='coerce').astype('float64')
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+# Copy stored weather values into the column arrays for rows whose FID and input hash match
+def reuse_weather(columns, fids, hashes, stored):
+    stored = stored.drop_duplicates('FID', keep='last').set_index('FID')
+    positions = stored.index.get_indexer(fids)
+    matched = positions >= 0
+    matched[matched] = stored['HASH'].to_numpy(dtype=np.uint64)[positions[matched]] == hashes[matched]
+
+    # Wildfires without any weather are retried in case their data files have since been downloaded
+    values = stored[WEATHER_COLUMNS].to_numpy(dtype=float)
+    matched[matched] = ~np.isnan(values[positions[matched]]).all(axis=1)
+    columns[matched] = values[positions[matched]]
+    return matched
+
+# Associate weather data only to new or changed wildfires, reusing a previous output and resuming from a checkpoint
+def associate_weather_incremental(fire_data, date_index, previous_output, checkpoint_path, workers=None):
+    num_fires = len(fire_data)
+    fids = fire_data['FID'].to_numpy()
+    if not pd.Index(fids).is_unique:
+        raise ValueError("FID values must be unique for incremental association")
+    hashes = input_hashes(fire_data)
+    columns = np.full((num_fires, len(WEATHER_COLUMNS)), np.nan)
+    done = np.zeros(num_fires, dtype=bool)
+
+    # Reuse the weather of wildfires whose inputs did not change since the previous output
+    if os.path.exists(previous_output):
+        previous = pd.read_csv(previous_output, usecols=['FID'] + INPUT_COLUMNS + WEATHER_COLUMNS, float_precision='round_trip')
+        previous['HASH'] = input_hashes(previous)
+        done |= reuse_weather(columns, fids, hashes, previous)
+
+    # Resume the wildfires finished by a crashed run
+    if os.path.exists(checkpoint_path):
+        done |= reuse_weather(columns, fids, hashes, pd.read_csv(checkpoint_path, float_precision='round_trip')) & ~done
+
+    pending = fire_data[~done]
+    print("Wildfires reused:", int(done.sum()), "/", num_fires, "- to associate:", len(pending))
+
+    # Checkpoint every finished shard so a crash only loses the shards in flight
+    hash_by_fid = pd.Series(hashes, index=fids)
+    fid_index = pd.Index(fids)
+    write_header = not os.path.exists(checkpoint_path)
+    for shard_fids, values in shard_results(shard_fires(pending), date_index, workers):
+        columns[fid_index.get_indexer(shard_fids)] = values
+        block = pd.DataFrame(values, columns=WEATHER_COLUMNS)
+        block.insert(0, 'HASH', hash_by_fid.loc[shard_fids].to_numpy())
+        block.insert(0, 'FID', shard_fids)
+        with metrics.stage('write'):
+            block.to_csv(checkpoint_path, mode='a', index=False, header=write_header)
+        write_header = False
+
+    for i, name in enumerate(WEATHER_COLUMNS):
+        fire_data[name] = columns[:, i]
+    return fire_data
+
+# NFDB columns kept by the streaming ingest, with compact types
+NFDB_COLUMNS = {
+    'FID': 'int64',
+    'LATITUDE': 'float32',
+    'LONGITUDE': 'float32',
+    'YEAR': 'Int16',
+    'MONTH': 'Int8',
+    'DAY': 'Int8',
+    'SIZE_HA': 'float32',
+    'CAUSE': 'category',
+    'CAUSE2': 'category',
+}
+
+# Stream the NFDB in chunks, associate weather data to each chunk and append it to the output
+def associate_weather_streaming(nfdb_path, date_index, output_path, chunksize=100000, workers=None, columns=NFDB_COLUMNS):
+    chunks = pd.read_csv(nfdb_path, sep=',', header=0, usecols=lambda name: name in columns, dtype=columns, chunksize=chunksize)
+
+    # Write to a temporary file so an interrupted run never leaves a partial output behind
+    temp_path = output_path + '.tmp'
+    scanned = 0
+
+    # One pool serves every chunk, so the workers start and receive the date index only once
+    executor = None if workers == 1 else worker_pool(date_index, workers)
+    try:
+        for number, chunk in enumerate(chunks):
+            if executor is None:
+                chunk = associate_weather(chunk, date_index)
+            else:
+                chunk = associate_weather_parallel(chunk, date_index, executor=executor)
+            with metrics.stage('write'):
+                chunk.to_csv(temp_path, mode='w' if number == 0 else 'a', index=False, header=number == 0)
+
+            scanned += len(chunk)
+            print("Wildfire chunks written:", number + 1, "-", scanned, "wildfires")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    os.replace(temp_path, output_path)
+
+# Number of worker processes used for the weather association
+WORKERS = os.cpu_count()
+
+# Load the date index of a folder of daily MERRA2 files, or open a compact store file in its place
+def load_date_index(path):
+    if os.path.isfile(path):
+        return CompactStore(path)
+    return index_files_by_date(path)
+
+# Command line entry point
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Associate MERRA2 weather data with NFDB wildfires")
+    parser.add_argument('--data', default='Data', help="folder of daily MERRA2 files, or a compact store file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('index', help="refresh the on-disk date index of the data folder")
+
+    forecast_parser = subparsers.add_parser('forecast', help="predict the weather for a month, day and location")
+    forecast_parser.add_argument('month', type=int)
+    forecast_parser.add_argument('day', type=int)
+    forecast_parser.add_argument('latitude', type=float)
+    forecast_parser.add_argument('longitude', type=float)
+    forecast_parser.add_argument('--climatology', help="folder of a precomputed climatology cube")
+
+    associate_parser = subparsers.add_parser('associate', help="associate weather data with every NFDB wildfire")
+    associate_parser.add_argument('--nfdb', default='NFDB_point_txt/NFDB_point_20240613.txt')
+    associate_parser.add_argument('--output', default='fire_data_processed.csv')
+    associate_parser.add_argument('--workers', type=int, default=WORKERS)
+    associate_parser.add_argument('--incremental', action='store_true', help="only associate wildfires that are new or changed since the existing output")
+    associate_parser.add_argument('--chunksize', type=int, help="stream the NFDB in chunks of this many rows with compact column types")
+    associate_parser.add_argument('--metrics', help="write per-stage timers and counters to this JSON file")
+    associate_parser.add_argument('--profile', help="profile the association and write the report to this file")
+    associate_parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile')
+
+    args = parser.parse_args(argv)
+
+    # The streaming path writes every wildfire, it cannot skip the unchanged ones
+    if args.command == 'associate' and args.incremental and args.chunksize:
+        associate_parser.error("--incremental cannot be combined with --chunksize")
+
+    # Index all the MERRA2 weather data files by date
+    with metrics.stage('index'):
+        date_index = load_date_index(args.data)
+
+    if args.command == 'index':
+        print("Indexed dates:", len(date_index.keys()))
+
+    elif args.command == 'forecast':
+        # Predict a future weather value
+        climatology = None
+        if args.climatology:
+            from climatology import Climatology
+            climatology = Climatology(args.climatology)
+        specific_humidity, temp, precip_ice, precip_water, precip_vapor, wind = futureWeather(args.month, args.day, args.latitude, args.longitude, date_index, climatology)
+        print("Predicted weather data:", specific_humidity, temp, precip_ice, precip_water, precip_vapor, wind)
+
+    elif args.command == 'associate' and args.chunksize:
+        # Stream the historical fire data so memory stays flat however large the NFDB grows
+        with profiled(args.profile, args.profiler):
+            associate_weather_streaming(args.nfdb, date_index, args.output, chunksize=args.chunksize, workers=args.workers)
+        print("Wildfire weather association completed successfully!")
+
+    elif args.command == 'associate':
+        # Read in historical fire data as a dataframe
+        with metrics.stage('read'):
+            fire_data = pd.read_csv(args.nfdb, sep=',', header=0, dtype={'YEAR': 'str','MONTH': 'str','DAY': 'str', 12: str, 13: str})
+        #fire_data = fire_data[fire_data['CAUSE'] == 'N'] # Do we want to filter by natural fires???
+
+        # For each historical fire, return the associated weather data
+        checkpoint_path = args.output + '.checkpoint.csv'
+        with profiled(args.profile, args.profiler):
+            if args.incremental:
+                fire_data = associate_weather_incremental(fire_data, date_index, args.output, checkpoint_path, workers=args.workers)
+            elif args.workers > 1:
+                fire_data = associate_weather_parallel(fire_data, date_index, workers=args.workers)
+            else:
+                fire_data = associate_weather(fire_data, date_index)
+
+        # Output associated fire data from a dataframe to a csv, replacing the previous output only once it is complete
+        with metrics.stage('write'):
+            fire_data.to_csv(args.output + '.tmp', index=False, header=True)
+        os.replace(args.output + '.tmp', args.output)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        print("Wildfire weather association completed successfully!")
+
+    if args.command == 'associate' and args.metrics:
+        metrics.write(args.metrics)
+        print("Metrics written to", args.metrics)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file